@@ -1,11 +1,201 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from settings import get_settings, worker_count
+
+settings = get_settings()
+
+
+class PoolMetrics:
+    """Estatísticas do pool de conexões alimentadas pelos eventos do pool."""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def _increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def instrument(self, engine):
+        @event.listens_for(engine, 'connect')
+        def on_connect(*_):
+            self._increment('connects')
+
+        @event.listens_for(engine, 'checkout')
+        def on_checkout(*_):
+            self._increment('checkouts')
+
+        @event.listens_for(engine, 'invalidate')
+        def on_invalidate(*_):
+            self._increment('invalidations')
+
+        return engine
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            stats = {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_ms_avg': (
+                    self.wait_seconds_total / self.waits * 1000
+                    if self.waits
+                    else 0.0
+                ),
+                'wait_ms_max': self.wait_seconds_max * 1000,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+            )
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedPoolMixin:
+    """Mede quanto tempo cada checkout esperou por uma conexão."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_wait(
+                time.perf_counter() - start, timed_out=True
+            )
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
 
-from settings import Settings
 
-engine = create_engine(Settings().DATABASE_URL)
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_limits(workers: int) -> tuple[int, int]:
+    """(pool_size, max_overflow) de cada worker.
+
+    Com DB_MAX_CONNECTIONS, a soma dos pools de todos os workers não passa
+    do limite: cada um fica com DB_MAX_CONNECTIONS // workers conexões,
+    primeiro no pool fixo (até DB_POOL_SIZE) e o resto como overflow.
+    """
+    pool_size, max_overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    if settings.DB_MAX_CONNECTIONS > 0:
+        share = max(1, settings.DB_MAX_CONNECTIONS // workers)
+        pool_size = min(pool_size, share)
+        max_overflow = min(max_overflow, share - pool_size)
+    return pool_size, max_overflow
+
+
+def engine_options(url, is_async: bool = False) -> dict:
+    options = {
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+    }
+    if make_url(url).get_backend_name() != 'sqlite':
+        pool_size, max_overflow = pool_limits(worker_count(settings))
+        options.update(
+            poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+_engine = None
+_async_engine = None
+# As primeiras requisições chegam juntas no threadpool; sem o lock cada
+# uma montaria (e instrumentaria) o seu pool
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Engine síncrona, criada na primeira sessão e não na importação:
+    a subida do processo não carrega o driver nem monta o pool."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = pool_metrics.instrument(
+                    create_engine(
+                        settings.DATABASE_URL,
+                        **engine_options(settings.DATABASE_URL),
+                    )
+                )
+    return _engine
+
+
+# Drivers assíncronos usados quando ASYNC_DB está ligado
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(url: str):
+    url = make_url(url)
+    return url.set(
+        drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    )
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                url = async_database_url(settings.DATABASE_URL)
+                engine = create_async_engine(
+                    url, **engine_options(url, is_async=True)
+                )
+                pool_metrics.instrument(engine.sync_engine)
+                _async_engine = engine
+    return _async_engine
+
+
+def active_pool():
+    if settings.ASYNC_DB:
+        return get_async_engine().pool
+    return get_engine().pool
 
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
+        yield session
+
+
+async def get_async_session():
+    async with AsyncSession(get_async_engine()) as session:
         yield session
@@ -0,0 +1,194 @@
+# loja/analytics.py
+"""Agregações vetorizadas sobre as linhas de venda de um período.
+
+load_sale_lines lê sale_items em lotes direto para colunas NumPy
+(SaleLines), pedindo created_at ao banco já em segundos desde 1970 para
+não criar um datetime por linha. As funções abaixo agregam essas colunas
+sem laço em Python: np.bincount para somas por balde, np.unique para
+agrupar por produto e somas acumuladas para a média móvel.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import BigInteger, Integer, cast, func, select
+from sqlalchemy.orm import Session
+
+import models
+
+# Linhas lidas do cursor por vez ao montar as colunas
+LOAD_BATCH_SIZE = 50_000
+
+UTC = ZoneInfo('UTC')
+
+
+@dataclass(frozen=True)
+class SaleLines:
+    """Colunas das linhas de venda; o índice i descreve a mesma linha em
+    todos os arrays. local_times está no fuso pedido, sem tzinfo."""
+
+    local_times: np.ndarray  # datetime64[s]
+    product_ids: np.ndarray  # int64
+    quantities: np.ndarray  # int64
+    revenue: np.ndarray  # float64, quantidade * preço unitário
+
+    def __len__(self):
+        return len(self.product_ids)
+
+
+def to_local(timestamps: np.ndarray, tz: ZoneInfo) -> np.ndarray:
+    """Converte horários UTC (datetime64) para o fuso tz.
+
+    O deslocamento é calculado uma vez por hora distinta e depois
+    aplicado a todas as linhas daquela hora.
+    """
+    hours, inverse = np.unique(
+        timestamps.astype('datetime64[h]'), return_inverse=True
+    )
+    offsets = np.array(
+        [
+            hour.item().replace(tzinfo=UTC).astimezone(tz).utcoffset()
+            .total_seconds()
+            for hour in hours
+        ],
+        dtype='int64',
+    )
+    return timestamps + offsets[inverse].astype('timedelta64[s]')
+
+
+def epoch_seconds(column, dialect_name: str):
+    """Expressão SQL com o horário em segundos desde 1970, ou a própria
+    coluna nos bancos sem uma função conhecida."""
+    if dialect_name == 'sqlite':
+        return cast(func.strftime('%s', column), Integer)
+    if dialect_name == 'postgresql':
+        return cast(func.extract('epoch', column), BigInteger)
+    return column
+
+
+def load_sale_lines(
+    session: Session,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    tz: ZoneInfo,
+) -> SaleLines:
+    """Linhas de venda do usuário com created_at em [start, end)."""
+    dialect_name = session.get_bind().dialect.name
+    created_at = epoch_seconds(models.Sale.created_at, dialect_name)
+    query = (
+        select(
+            created_at,
+            models.SaleItem.product_id,
+            models.SaleItem.QT,
+            models.SaleItem.product_price,
+        )
+        .select_from(models.SaleItem)
+        .join(models.Sale)
+        .where(
+            models.Sale.user_id == user_id,
+            models.Sale.created_at >= start,
+            models.Sale.created_at < end,
+        )
+        .execution_options(yield_per=LOAD_BATCH_SIZE)
+    )
+
+    times_dtype = (
+        'datetime64[s]' if created_at is models.Sale.created_at else 'int64'
+    )
+    times, product_ids, quantities, prices = [], [], [], []
+    for rows in session.connection().execute(query).partitions():
+        created, product, quantity, price = zip(*rows)
+        times.append(np.array(created, dtype=times_dtype))
+        product_ids.append(np.array(product, dtype='int64'))
+        quantities.append(np.array(quantity, dtype='int64'))
+        prices.append(np.array(price, dtype='float64'))
+
+    if not times:
+        return SaleLines(
+            local_times=np.empty(0, dtype='datetime64[s]'),
+            product_ids=np.empty(0, dtype='int64'),
+            quantities=np.empty(0, dtype='int64'),
+            revenue=np.empty(0, dtype='float64'),
+        )
+
+    quantity = np.concatenate(quantities)
+    return SaleLines(
+        local_times=to_local(
+            np.concatenate(times).astype('datetime64[s]'), tz
+        ),
+        product_ids=np.concatenate(product_ids),
+        quantities=quantity,
+        revenue=quantity * np.concatenate(prices),
+    )
+
+
+def _buckets(keys: np.ndarray, lines: SaleLines, size: int):
+    quantity = np.bincount(keys, weights=lines.quantities, minlength=size)
+    revenue = np.bincount(keys, weights=lines.revenue, minlength=size)
+    return quantity.astype('int64'), revenue
+
+
+def by_hour(lines: SaleLines):
+    """Quantidade e receita por hora do dia (0 a 23)."""
+    hours = (
+        lines.local_times.astype('datetime64[h]')
+        - lines.local_times.astype('datetime64[D]')
+    ).astype('int64')
+    return _buckets(hours, lines, 24)
+
+
+def by_weekday(lines: SaleLines):
+    """Quantidade e receita por dia da semana (0 = segunda-feira)."""
+    days = lines.local_times.astype('datetime64[D]').astype('int64')
+    # 1970-01-01, o dia 0, foi uma quinta-feira
+    return _buckets((days + 3) % 7, lines, 7)
+
+
+def by_product(lines: SaleLines):
+    """(product_ids, quantidade, receita), em ordem decrescente de receita."""
+    product_ids, inverse = np.unique(lines.product_ids, return_inverse=True)
+    quantity, revenue = _buckets(inverse, lines, len(product_ids))
+    order = np.argsort(-revenue, kind='stable')
+    return product_ids[order], quantity[order], revenue[order]
+
+
+def quantity_histogram(lines: SaleLines, bins: int = 10):
+    """Histograma da quantidade vendida por linha: (bordas, contagens).
+
+    Com poucas quantidades distintas cada balde é um valor inteiro.
+    """
+    if not len(lines):
+        return np.array([], dtype='float64'), np.array([], dtype='int64')
+    low, high = lines.quantities.min(), lines.quantities.max()
+    bins = int(min(bins, high - low + 1))
+    counts, edges = np.histogram(
+        lines.quantities, bins=bins, range=(low, high + 1)
+    )
+    return edges, counts
+
+
+def daily_revenue(
+    lines: SaleLines, start_day: date, end_day: date, window: int = 7
+):
+    """Receita por dia em [start_day, end_day] e média móvel de `window`
+    dias. Os primeiros window - 1 dias não têm média (NaN); linhas fora
+    do intervalo são ignoradas."""
+    first = np.datetime64(start_day, 'D')
+    size = (np.datetime64(end_day, 'D') - first).astype('int64') + 1
+    offsets = (lines.local_times.astype('datetime64[D]') - first).astype(
+        'int64'
+    )
+    inside = (offsets >= 0) & (offsets < size)
+    revenue = np.bincount(
+        offsets[inside], weights=lines.revenue[inside], minlength=size
+    )
+
+    moving = np.full(size, np.nan)
+    if size >= window:
+        totals = np.cumsum(np.concatenate(([0.0], revenue)))
+        moving[window - 1:] = (totals[window:] - totals[:-window]) / window
+
+    days = first + np.arange(size)
+    return days, revenue, moving
@@ -0,0 +1,153 @@
+# loja/assets.py
+"""Arquivos de static/ com hash no nome e pré-comprimidos.
+
+    python -m assets
+
+copia cada arquivo de static/ para static/dist/<nome>.<hash>.<ext>, grava
+ao lado as versões .gz e .br (só .gz se o brotli faltar no ambiente) e o
+manifest.json com {nome original: caminho com hash}. Os templates usam
+asset('api.js'), que aponta para a versão com hash quando o manifesto
+existe; como o nome muda junto com o conteúdo, esses arquivos vão com
+Cache-Control immutable de um ano. Sem o build (desenvolvimento),
+asset() devolve o arquivo original, servido com revalidação.
+
+Rode o build de novo depois de editar static/, senão asset() continua
+apontando para as cópias antigas.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from functools import lru_cache
+from mimetypes import guess_type
+from pathlib import Path
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+from compression import accepted_encodings, brotli
+
+STATIC_DIR = Path(__file__).parent / 'static'
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.js', '.css', '.html', '.json', '.svg', '.txt'}
+# Preferência ao servir; .br só existe se o build tinha o brotli
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    path = Path(name)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return (Path(DIST) / path.with_name(
+        f'{path.stem}.{digest}{path.suffix}'
+    )).as_posix()
+
+
+def _write_if_smaller(target: Path, data: bytes, original: bytes):
+    if len(data) < len(original):
+        target.write_bytes(data)
+
+
+def build(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    """Gera static/dist e devolve o manifesto."""
+    dist = static_dir / DIST
+    shutil.rmtree(dist, ignore_errors=True)
+
+    manifest = {}
+    for source in sorted(static_dir.rglob('*')):
+        if not source.is_file() or dist in source.parents:
+            continue
+        name = source.relative_to(static_dir).as_posix()
+        data = source.read_bytes()
+        target = static_dir / hashed_name(name, data)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+
+        if source.suffix in COMPRESSIBLE:
+            # mtime=0: o mesmo conteúdo gera sempre o mesmo .gz
+            _write_if_smaller(
+                target.with_name(target.name + '.gz'),
+                gzip.compress(data, compresslevel=9, mtime=0),
+                data,
+            )
+            if brotli is not None:
+                _write_if_smaller(
+                    target.with_name(target.name + '.br'),
+                    brotli.compress(data, quality=11),
+                    data,
+                )
+        manifest[name] = target.relative_to(static_dir).as_posix()
+
+    dist.mkdir(exist_ok=True)
+    (dist / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+@lru_cache
+def manifest(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    try:
+        return json.loads((static_dir / DIST / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def url(name: str) -> str:
+    """URL de um arquivo de static/ para os templates."""
+    return f'/static/{manifest().get(name, name)}'
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles que serve o .br/.gz gerado pelo build quando o cliente
+    aceita, e marca como immutable os arquivos com hash de static/dist."""
+
+    def __init__(self, *, directory: str | os.PathLike, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.hashed_dir = os.path.realpath(os.path.join(directory, DIST))
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike,
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        full_path = os.fspath(full_path)
+        hashed = full_path.startswith(self.hashed_dir + os.sep)
+        headers = {'Cache-Control': IMMUTABLE if hashed else REVALIDATE}
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(
+            request_headers.get('accept-encoding', '')
+        )
+
+        path, media_type = full_path, None
+        for encoding, suffix in PRECOMPRESSED:
+            if not os.path.isfile(full_path + suffix):
+                continue
+            headers['Vary'] = 'Accept-Encoding'
+            if encoding in accepted and path == full_path:
+                path = full_path + suffix
+                stat_result = os.stat(path)
+                media_type = guess_type(full_path)[0] or 'text/plain'
+                headers['Content-Encoding'] = encoding
+
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == '__main__':
+    files = build()
+    print(f'{len(files)} arquivos em {STATIC_DIR / DIST}')
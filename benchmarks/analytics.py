@@ -0,0 +1,137 @@
+"""Agregações por hora, dia da semana e produto: linha a linha em Python
+(como os relatórios atuais) vs colunas NumPy do módulo analytics.
+
+Uso: python -m benchmarks.analytics [--rows 1000000] [--url sqlite:///...]
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+import analytics
+import models
+from benchmarks.checkout import CART_SIZES, setup_database
+from routers.sales import day_range
+
+TZ = ZoneInfo('America/Sao_Paulo')
+START = date(2025, 1, 1)
+
+
+def seed_sale_lines(engine, user_id: int, rows: int):
+    rng = random.Random(42)
+    moment = datetime(2025, 1, 1, 3)
+    # Duas linhas por venda, espalhadas por ~6 meses
+    step = timedelta(seconds=180 * 24 * 3600 * 2 / rows)
+    with Session(engine) as session:
+        sale_id = 0
+        for offset in range(0, rows, 20_000):
+            sales, items = [], []
+            for _ in range(offset, min(offset + 20_000, rows), 2):
+                sale_id += 1
+                moment += step
+                sales.append(
+                    {'user_id': user_id, 'total_price': 0.0,
+                     'created_at': moment}
+                )
+                for _ in range(2):
+                    product_id = rng.randint(1, max(CART_SIZES))
+                    items.append({
+                        'sale_id': sale_id,
+                        'product_id': product_id,
+                        'QT': rng.randint(1, 5),
+                        'product_price': 1.0 + product_id,
+                    })
+            session.execute(insert(models.Sale), sales)
+            session.execute(insert(models.SaleItem), items)
+        session.commit()
+
+
+def row_by_row(session: Session, user_id: int, start, end):
+    """O caminho atual: linhas do ORM agregadas uma a uma."""
+    hourly = defaultdict(float)
+    weekday = defaultdict(float)
+    per_product = defaultdict(lambda: [0, 0.0])
+    rows = session.execute(
+        select(
+            models.Sale.created_at,
+            models.SaleItem.product_id,
+            models.SaleItem.QT,
+            models.SaleItem.product_price,
+        )
+        .select_from(models.SaleItem)
+        .join(models.Sale)
+        .where(
+            models.Sale.user_id == user_id,
+            models.Sale.created_at >= start,
+            models.Sale.created_at < end,
+        )
+    ).all()
+    utc = ZoneInfo('UTC')
+    for created_at, product_id, quantity, price in rows:
+        local = created_at.replace(tzinfo=utc).astimezone(TZ)
+        revenue = quantity * price
+        hourly[local.hour] += revenue
+        weekday[local.weekday()] += revenue
+        per_product[product_id][0] += quantity
+        per_product[product_id][1] += revenue
+    return hourly, weekday, per_product
+
+
+def vectorized(session: Session, user_id: int, start, end):
+    lines = analytics.load_sale_lines(session, user_id, start, end, TZ)
+    return (
+        analytics.by_hour(lines),
+        analytics.by_weekday(lines),
+        analytics.by_product(lines),
+        lines,
+    )
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--url', default='sqlite:///:memory:')
+    args = parser.parse_args()
+
+    engine, user_id = setup_database(args.url)
+    seed_sale_lines(engine, user_id, args.rows)
+    start, end = day_range(START, START + timedelta(days=365), TZ)
+
+    with Session(engine) as session:
+        python_seconds, (hourly, _, _) = timed(
+            row_by_row, session, user_id, start, end
+        )
+    with Session(engine) as session:
+        numpy_seconds, ((_, revenue), _, _, lines) = timed(
+            vectorized, session, user_id, start, end
+        )
+        # Só a agregação, com as colunas já carregadas
+        aggregate_seconds, _ = timed(
+            lambda: (
+                analytics.by_hour(lines),
+                analytics.by_weekday(lines),
+                analytics.by_product(lines),
+            )
+        )
+
+    assert abs(sum(hourly.values()) - revenue.sum()) < 1e-6 * revenue.sum()
+    print(f'{len(lines)} linhas de venda')
+    print(f'{"caminho":<22} {"tempo (s)":>10}')
+    print(f'{"linha a linha":<22} {python_seconds:>10.2f}')
+    print(f'{"numpy (com leitura)":<22} {numpy_seconds:>10.2f}')
+    print(f'{"numpy (só agregação)":<22} {aggregate_seconds:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
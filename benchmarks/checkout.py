@@ -0,0 +1,90 @@
+"""Round trips e latência p99 do checkout em função do tamanho do carrinho.
+
+Uso: python -m benchmarks.checkout [--iterations 200] [--url sqlite:///...]
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import checkout
+import models
+import schemas
+
+CART_SIZES = [1, 5, 10, 20, 40, 80]
+
+
+def setup_database(url: str):
+    engine = create_engine(
+        url,
+        connect_args={'check_same_thread': False}
+        if url.startswith('sqlite')
+        else {},
+        poolclass=StaticPool if url.startswith('sqlite') else None,
+    )
+    models.table_registry.metadata.drop_all(engine)
+    models.table_registry.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        user = models.User(
+            username='bench', password='x', email='bench@bench.com'
+        )
+        session.add(user)
+        session.flush()
+        session.add_all([
+            models.Product(
+                user_id=user.id,
+                name=f'produto {i}',
+                description=None,
+                price=1.0 + i,
+                QT=10**9,
+            )
+            for i in range(max(CART_SIZES))
+        ])
+        session.commit()
+        return engine, user.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--url', default='sqlite:///:memory:')
+    args = parser.parse_args()
+
+    engine, user_id = setup_database(args.url)
+    round_trips = 0
+
+    def count(*_):
+        nonlocal round_trips
+        round_trips += 1
+
+    event.listen(engine, 'before_cursor_execute', count)
+
+    print(
+        f'{"itens":>6} {"round trips":>12} {"p50 (ms)":>10} {"p99 (ms)":>10}'
+    )
+    for size in CART_SIZES:
+        items = [
+            schemas.SaleItemSchema(product_id=product_id, QT=1)
+            for product_id in range(1, size + 1)
+        ]
+        latencies = []
+        round_trips = 0
+        for _ in range(args.iterations):
+            with Session(engine) as session:
+                start = time.perf_counter()
+                checkout.place_order(session, user_id, items)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f'{size:>6} {round_trips / args.iterations:>12.1f} '
+            f'{statistics.median(latencies):>10.2f} {quantiles[98]:>10.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
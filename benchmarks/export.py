@@ -0,0 +1,101 @@
+"""Memória de pico e tempo até o primeiro byte: relatório em JSON vs
+exportação em streaming de /sales/report_by_period.
+
+Uso: python -m benchmarks.export [--rows 200000] [--url sqlite:///...]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from fastapi import Response
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import models
+from benchmarks.checkout import setup_database
+from routers import sales
+from security import AuthenticatedUser
+
+
+def seed_sales(engine, user_id: int, rows: int):
+    start = datetime(2025, 1, 1)
+    with Session(engine) as session:
+        for offset in range(0, rows, 10_000):
+            batch = range(offset, min(offset + 10_000, rows))
+            session.execute(insert(models.Sale), [
+                {
+                    'user_id': user_id,
+                    'total_price': 1.0,
+                    'created_at': start + timedelta(seconds=30 * i),
+                }
+                for i in batch
+            ])
+            session.execute(insert(models.SaleItem), [
+                {
+                    'sale_id': i + 1,
+                    'product_id': 1,
+                    'QT': 1,
+                    'product_price': 1.0,
+                }
+                for i in batch
+            ])
+        session.commit()
+
+
+def measure(label: str, produce):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in produce():
+        if first_byte is None and chunk:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f'{label:<10} {first_byte * 1000:>12.1f} {total:>9.2f} '
+        f'{peak / 2**20:>10.1f} {size / 2**20:>9.1f}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--url', default='sqlite:///:memory:')
+    args = parser.parse_args()
+
+    engine, user_id = setup_database(args.url)
+    seed_sales(engine, user_id, args.rows)
+    start_date, end_date = date(2024, 1, 1), date(2030, 1, 1)
+    query = sales.period_query(user_id, start_date, end_date)
+
+    def json_report():
+        with Session(engine) as session:
+            report = sales.get_sales_by_period(
+                response=Response(),
+                session=session,
+                current_user=AuthenticatedUser(
+                    id=user_id, username='bench', email='bench@bench.com'
+                ),
+                start_date=start_date,
+                end_date=end_date,
+            )
+        yield report.body
+
+    print(
+        f'{"formato":<10} {"1º byte (ms)":>12} {"total (s)":>9} '
+        f'{"pico (MB)":>10} {"saída (MB)":>9}'
+    )
+    measure('json', json_report)
+    for export_format in ('ndjson', 'csv'):
+        measure(
+            export_format,
+            lambda: sales.stream_sales_export(engine, query, export_format),
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Requisições por segundo em GET /products/ com e sem o cache de JWT.
+
+Uso: python -m benchmarks.jwt_cache [--requests 2000]
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import models
+import security
+from DB import get_session
+from main import app
+
+
+def setup_client():
+    engine = create_engine(
+        'sqlite:///:memory:',
+        connect_args={'check_same_thread': False},
+        poolclass=StaticPool,
+    )
+    models.table_registry.metadata.create_all(engine)
+    session = Session(engine)
+
+    user = models.User(
+        username='bench', password='x', email='bench@bench.com'
+    )
+    session.add(user)
+    session.flush()
+    session.add_all([
+        models.Product(
+            user_id=user.id, name=f'p{i}', description=None, price=1, QT=1
+        )
+        for i in range(20)
+    ])
+    session.commit()
+
+    app.dependency_overrides[get_session] = lambda: session
+    return TestClient(app)
+
+
+def requests_per_second(client, headers, total):
+    start = time.perf_counter()
+    for _ in range(total):
+        client.get('/products/', headers=headers)
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    client = setup_client()
+    token = security.create_access_token({'sub': 'bench'})
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/products/', headers=headers)
+
+    maxsize = security.token_cache.maxsize
+    security.token_cache.maxsize = 0
+    security.token_cache.clear()
+    without_cache = requests_per_second(client, headers, args.requests)
+
+    security.token_cache.maxsize = maxsize
+    with_cache = requests_per_second(client, headers, args.requests)
+
+    print(f'sem cache: {without_cache:8.1f} req/s')
+    print(f'com cache: {with_cache:8.1f} req/s')
+    print(f'ganho:     {with_cache / without_cache - 1:8.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Vazão da importação em lote de produtos (POST /products/bulk) e do
+ajuste de estoque em lote (PATCH /products/stock).
+
+Uso: python -m benchmarks.product_import [--rows 50000] [--batch-size 1000]
+     [--url sqlite:///...]
+"""
+import argparse
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import catalog
+import models
+import schemas
+from benchmarks.checkout import setup_database
+
+
+def csv_catalog(rows: int, ids: list[int] | None = None) -> bytes:
+    lines = ['id,name,description,price,QT']
+    for i in range(rows):
+        product_id = ids[i] if ids else ''
+        lines.append(f'{product_id},produto {i},descrição {i},{i % 100}.5,{i}')
+    return '\n'.join(lines).encode()
+
+
+def run(engine, user_id: int, content: bytes, import_format: str, size: int):
+    with Session(engine) as session:
+        start = time.perf_counter()
+        result = catalog.import_products(
+            session,
+            user_id,
+            catalog.parse_rows(content, import_format),
+            size,
+        )
+        seconds = time.perf_counter() - start
+    assert not result.errors
+    return result.inserted + result.updated, seconds
+
+
+def report(label: str, rows: int, seconds: float):
+    print(f'{label:<10} {rows:>8} {seconds:>10.2f} {rows / seconds:>10.0f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--url', default='sqlite:///:memory:')
+    args = parser.parse_args()
+
+    engine, user_id = setup_database(args.url)
+    content = csv_catalog(args.rows)
+
+    print(f'{"operação":<10} {"linhas":>8} {"tempo (s)":>10} {"linhas/s":>10}')
+    rows, seconds = run(engine, user_id, content, 'csv', args.batch_size)
+    report('insert', rows, seconds)
+
+    with Session(engine) as session:
+        ids = session.scalars(
+            select(models.Product.id)
+            .where(models.Product.name.like('produto %'))
+            .order_by(models.Product.id.desc())
+            .limit(args.rows)
+        ).all()
+    content = csv_catalog(len(ids), ids)
+    rows, seconds = run(engine, user_id, content, 'csv', args.batch_size)
+    report('update', rows, seconds)
+
+    adjustments = [
+        schemas.StockAdjustment(product_id=product_id, delta=-1)
+        if i % 2
+        else schemas.StockAdjustment(product_id=product_id, QT=i)
+        for i, product_id in enumerate(ids)
+    ]
+    with Session(engine) as session:
+        start = time.perf_counter()
+        result = catalog.adjust_stock(
+            session, user_id, adjustments, args.batch_size
+        )
+        seconds = time.perf_counter() - start
+    rows = result.updated
+    report('estoque', rows, seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Custo por linha de serializar /sales/report_by_period: modelos
+pydantic revalidados pelo response_model (caminho antigo) vs. linhas
+direto para JSON com orjson (serialization.json_response).
+
+Uso: python -m benchmarks.serialization [--rows 10000 100000]
+     [--repeat 5] [--url sqlite:///...]
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from sqlalchemy.orm import Session
+
+import schemas
+import serialization
+from benchmarks.checkout import setup_database
+from benchmarks.export import seed_sales
+from main import app
+from routers import sales
+
+
+def response_field():
+    for route in app.routes:
+        if getattr(route, 'path', None) == '/sales/report_by_period':
+            return route.response_field
+    raise LookupError('/sales/report_by_period')
+
+
+def pydantic_path(rows, field) -> bytes:
+    """O que o endpoint fazia: um SaleItemReport por linha, o container
+    e a validação do FastAPI contra o response_model."""
+    report = schemas.SalesByPeriodReport(sales=[
+        schemas.SaleItemReport(
+            product_name=row.product_name,
+            quantity_sold=row.quantity_sold,
+            sale_date=row.sale_date,
+            total_price=row.total_price,
+        )
+        for row in rows
+    ])
+    content = asyncio.run(
+        serialize_response(field=field, response_content=report)
+    )
+    return JSONResponse(content).body
+
+
+def orjson_path(rows, field) -> bytes:
+    return serialization.json_response(
+        {'sales': serialization.row_dicts(rows, sales.EXPORT_COLUMNS)},
+        Response(),
+    ).body
+
+
+def best_of(function, rows, field, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(rows, field)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--rows', type=int, nargs='+', default=[10_000, 100_000]
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--url', default='sqlite:///:memory:')
+    args = parser.parse_args()
+
+    engine, user_id = setup_database(args.url)
+    seed_sales(engine, user_id, max(args.rows))
+    with Session(engine) as session:
+        all_rows = session.execute(
+            sales.period_query(user_id, date(2024, 1, 1), date(2030, 1, 1))
+        ).all()
+    field = response_field()
+
+    print(
+        f'{"linhas":>8} {"caminho":<9} {"total (ms)":>11} '
+        f'{"µs/linha":>9} {"ganho":>6}'
+    )
+    for count in args.rows:
+        rows = all_rows[:count]
+        assert orjson_path(rows, field).count(b'product_name') == count
+        before = best_of(pydantic_path, rows, field, args.repeat)
+        after = best_of(orjson_path, rows, field, args.repeat)
+        for label, seconds in (('pydantic', before), ('orjson', after)):
+            print(
+                f'{count:>8} {label:<9} {seconds * 1000:>11.1f} '
+                f'{seconds / count * 1e6:>9.2f} {before / seconds:>5.1f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
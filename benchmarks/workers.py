@@ -0,0 +1,175 @@
+"""Vazão do servidor de produção (python -m server) em função do número de
+workers.
+
+Sobe o servidor com WEB_WORKERS = 1, 2, 4... sobre um SQLite temporário,
+dispara --clients processos clientes contra --path por --seconds e mostra
+requisições por segundo, p50/p99 e o ganho sobre 1 worker. Os clientes
+rodam na mesma máquina e disputam CPU com os workers: para números de
+produção aponte --target para um servidor em outra máquina.
+
+Uso: python -m benchmarks.workers [--workers 1 2 4] [--clients 8]
+     [--seconds 10] [--path /products/?limit=50] [--target http://...]
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import models
+import security
+
+ROOT = Path(__file__).parents[1]
+USERNAME, PASSWORD = 'bench', 'benchbench'
+
+
+def setup_database(path: Path) -> str:
+    url = f'sqlite:///{path}'
+    engine = create_engine(url)
+    models.table_registry.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = models.User(
+            username=USERNAME,
+            password=security._hash_password(PASSWORD),
+            email='bench@bench.com',
+        )
+        session.add(user)
+        session.flush()
+        session.add_all([
+            models.Product(
+                user_id=user.id,
+                name=f'produto {i}',
+                description=f'descrição {i}',
+                price=1.0 + i,
+                QT=100,
+            )
+            for i in range(200)
+        ])
+        session.commit()
+    engine.dispose()
+    return url
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, database_url: str, port: int):
+    env = dict(
+        os.environ,
+        WEB_WORKERS=str(workers),
+        WEB_HOST='127.0.0.1',
+        PORT=str(port),
+        DATABASE_URL=database_url,
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'server'],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f'{base_url}/login').raise_for_status()
+            return process, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('o servidor não respondeu em 30 s')
+
+
+def login(base_url: str) -> str:
+    response = httpx.post(
+        f'{base_url}/auth/token',
+        data={'username': USERNAME, 'password': PASSWORD},
+    )
+    response.raise_for_status()
+    return response.json()['access_token']
+
+
+def client(args) -> list[float]:
+    url, token, seconds = args
+    latencies = []
+    headers = {'Authorization': f'Bearer {token}'}
+    with httpx.Client(headers=headers) as http:
+        deadline = time.perf_counter() + seconds
+        while (start := time.perf_counter()) < deadline:
+            http.get(url).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_load(url: str, token: str, clients: int, seconds: float):
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(client, [(url, token, seconds)] * clients)
+    latencies = sorted(latency for result in results for latency in result)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    return len(latencies) / seconds, statistics.median(latencies), p99
+
+
+def report(label, throughput, p50, p99, baseline):
+    print(
+        f'{label:>8} {throughput:>10.0f} {p50 * 1000:>9.1f} '
+        f'{p99 * 1000:>9.1f} {throughput / baseline:>6.2f}x'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--path', default='/products/?limit=50')
+    parser.add_argument(
+        '--target', default=None, help='servidor já no ar (não sobe um)'
+    )
+    args = parser.parse_args()
+
+    print(f'CPUs disponíveis: {len(os.sched_getaffinity(0))}')
+    print(
+        f'{"workers":>8} {"req/s":>10} {"p50 (ms)":>9} {"p99 (ms)":>9} '
+        f'{"ganho":>7}'
+    )
+    if args.target:
+        token = login(args.target)
+        throughput, p50, p99 = run_load(
+            args.target + args.path, token, args.clients, args.seconds
+        )
+        report('-', throughput, p50, p99, throughput)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = setup_database(Path(tmp) / 'bench.db')
+        baseline = None
+        for workers in args.workers:
+            process, base_url = start_server(
+                workers, database_url, free_port()
+            )
+            try:
+                token = login(base_url)
+                throughput, p50, p99 = run_load(
+                    base_url + args.path, token, args.clients, args.seconds
+                )
+            finally:
+                process.terminate()
+                process.wait()
+            baseline = baseline or throughput
+            report(workers, throughput, p50, p99, baseline)
+
+
+if __name__ == '__main__':
+    main()
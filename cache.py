@@ -0,0 +1,91 @@
+# loja/cache.py
+import importlib
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU em memória com expiração por entrada e contadores.
+
+    É seguro para uso entre threads. Com maxsize=0 o cache fica desligado:
+    set() não guarda nada e toda leitura conta como miss.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires_at = self._data.get(key, (_MISSING, 0))
+            if value is _MISSING or expires_at <= time.time():
+                if value is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at: float | None = None):
+        if self.maxsize <= 0:
+            return
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            value, _ = self._data.pop(key, (None, 0))
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def load_backend(path: str, maxsize: int, ttl: float):
+    """Backend de cache a partir de 'modulo:fabrica' (ou um TTLCache em
+    memória quando path é vazio).
+
+    A fábrica recebe (maxsize, ttl) e deve devolver um objeto com a mesma
+    interface do TTLCache: get, set(key, value, expires_at=None), pop,
+    clear e stats. Os valores guardados são dicts, listas e escalares,
+    serializáveis em JSON para backends compartilhados entre processos.
+    """
+    if not path:
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    module_name, _, factory = path.partition(':')
+    return getattr(importlib.import_module(module_name), factory)(
+        maxsize, ttl
+    )
@@ -0,0 +1,355 @@
+# loja/catalog.py
+"""Importação de produtos e ajuste de estoque em lote.
+
+POST /products/bulk:
+
+O corpo chega em JSON (array), NDJSON ou CSV; cada linha é validada com
+schemas.ProductImportSchema e os erros são devolvidos por linha, sem
+derrubar as demais. Linhas sem id viram INSERT e linhas com id atualizam
+o produto do usuário, sempre em executemany de até
+Settings.PRODUCT_IMPORT_BATCH_SIZE linhas, e tudo num único commit.
+
+PATCH /products/stock: adjust_stock aplica variações e contagens
+absolutas com um UPDATE ... FROM (VALUES ...) por lote.
+"""
+import csv
+import io
+import json
+from functools import lru_cache
+from http import HTTPStatus
+from itertools import islice
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import Integer, bindparam, insert, select, text, update
+from sqlalchemy.orm import Session
+from starlette.datastructures import UploadFile
+
+import models
+import schemas
+import versions
+from product_cache import product_cache
+
+IMPORT_FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'text/csv': 'csv',
+}
+# Para uploads sem content type conhecido; o padrão é CSV
+IMPORT_EXTENSIONS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+PRODUCT_FIELDS = ['name', 'description', 'price', 'QT']
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=detail)
+
+
+async def import_payload(request: Request) -> tuple[str, bytes]:
+    """Dependência: (formato, conteúdo) do corpo ou do arquivo enviado
+    no campo `file` de um multipart/form-data."""
+    content_type = request.headers.get('content-type', '')
+    media_type = content_type.split(';')[0].strip().lower()
+
+    if media_type == 'multipart/form-data':
+        form = await request.form()
+        upload = form.get('file')
+        if not isinstance(upload, UploadFile):
+            raise _bad_request('Missing file field')
+        import_format = IMPORT_FORMATS.get(upload.content_type) or next(
+            (
+                fmt for ext, fmt in IMPORT_EXTENSIONS.items()
+                if (upload.filename or '').lower().endswith(ext)
+            ),
+            'csv',
+        )
+        return import_format, await upload.read()
+
+    if media_type not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            detail='Use application/json, application/x-ndjson, text/csv '
+            'or a multipart file upload',
+        )
+    return IMPORT_FORMATS[media_type], await request.body()
+
+
+def parse_rows(content: bytes, import_format: str):
+    """Gera (número da linha, dados ou erro de leitura) para o corpo.
+
+    Linhas são numeradas a partir de 1, sem contar o cabeçalho do CSV.
+    """
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise _bad_request('Body must be UTF-8')
+
+    if import_format == 'json':
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as error:
+            raise _bad_request(f'Invalid JSON: {error}')
+        if not isinstance(rows, list):
+            raise _bad_request('Expected a JSON array of products')
+        yield from enumerate(rows, start=1)
+
+    elif import_format == 'ndjson':
+        lines = (line for line in text.splitlines() if line.strip())
+        for number, line in enumerate(lines, start=1):
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as error:
+                yield number, f'Invalid JSON: {error}'
+
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        for number, row in enumerate(reader, start=1):
+            # Célula vazia no CSV equivale a campo ausente
+            yield number, {
+                key: value for key, value in row.items()
+                if key and value not in ('', None)
+            }
+
+
+def validation_message(error: ValidationError) -> str:
+    return '; '.join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}"
+        for e in error.errors(include_url=False)
+    )
+
+
+def validate_rows(rows):
+    """Separa as linhas válidas (número, schema) dos erros por linha."""
+    valid, errors = [], []
+    for number, data in rows:
+        if isinstance(data, str):
+            errors.append(schemas.ProductImportError(row=number, detail=data))
+            continue
+        try:
+            valid.append(
+                (number, schemas.ProductImportSchema.model_validate(data))
+            )
+        except ValidationError as error:
+            errors.append(schemas.ProductImportError(
+                row=number, detail=validation_message(error)
+            ))
+    return valid, errors
+
+
+def _batches(items, size: int):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def insert_products(
+    session: Session,
+    user_id: int,
+    products: list[schemas.ProductImportSchema],
+    batch_size: int,
+) -> int:
+    for batch in _batches(products, batch_size):
+        session.execute(
+            insert(models.Product.__table__),
+            [
+                {'user_id': user_id, **p.model_dump(include=PRODUCT_FIELDS)}
+                for p in batch
+            ],
+        )
+    return len(products)
+
+
+def update_products(
+    session: Session,
+    user_id: int,
+    rows: list[tuple[int, schemas.ProductImportSchema]],
+    batch_size: int,
+) -> tuple[int, list[schemas.ProductImportError]]:
+    """Atualiza por id os produtos do usuário; ids de outro usuário ou
+    inexistentes viram erro da linha."""
+    products = models.Product.__table__
+    statement = (
+        update(products)
+        .where(
+            products.c.id == bindparam('product_id'),
+            products.c.user_id == user_id,
+        )
+        .values({field: bindparam(field) for field in PRODUCT_FIELDS})
+    )
+    updated, errors = 0, []
+
+    for batch in _batches(rows, batch_size):
+        owned = set(session.scalars(
+            select(products.c.id).where(
+                products.c.user_id == user_id,
+                products.c.id.in_({p.id for _, p in batch}),
+            )
+        ))
+        params = []
+        for number, product in batch:
+            if product.id not in owned:
+                errors.append(schemas.ProductImportError(
+                    row=number, detail=f'Product {product.id} not found'
+                ))
+                continue
+            params.append({
+                'product_id': product.id,
+                **product.model_dump(include=PRODUCT_FIELDS),
+            })
+        if params:
+            session.execute(statement, params)
+            updated += len(params)
+
+    return updated, errors
+
+
+def import_products(
+    session: Session, user_id: int, rows, batch_size: int
+) -> schemas.ProductImportResult:
+    return write_products(session, user_id, *validate_rows(rows), batch_size)
+
+
+def write_products(
+    session: Session,
+    user_id: int,
+    valid: list[tuple[int, schemas.ProductImportSchema]],
+    errors: list[schemas.ProductImportError],
+    batch_size: int,
+) -> schemas.ProductImportResult:
+    """Grava as linhas já validadas por validate_rows.
+
+    A validação é só CPU e fica de fora: o router assíncrono a roda num
+    thread e passa para a sessão apenas esta parte. Se nada for gravado a
+    versão do usuário não muda, e os ETags e o cache continuam valendo.
+    """
+    if not valid:
+        return schemas.ProductImportResult(
+            inserted=0, updated=0, errors=errors
+        )
+
+    inserted = insert_products(
+        session,
+        user_id,
+        [product for _, product in valid if product.id is None],
+        batch_size,
+    )
+    updated, update_errors = update_products(
+        session,
+        user_id,
+        [(n, product) for n, product in valid if product.id is not None],
+        batch_size,
+    )
+    if inserted or updated:
+        versions.bump(session, user_id)
+        session.commit()
+        product_cache.invalidate(user_id)
+
+    return schemas.ProductImportResult(
+        inserted=inserted,
+        updated=updated,
+        errors=sorted(errors + update_errors, key=lambda e: e.row),
+    )
+
+
+def merge_adjustments(
+    items: list[schemas.StockAdjustment],
+) -> dict[int, tuple[int | None, int]]:
+    """Reduz os ajustes a um (QT absoluto ou None, delta) por produto,
+    respeitando a ordem: uma contagem absoluta descarta os deltas
+    anteriores e os seguintes somam sobre ela."""
+    merged = {}
+    for item in items:
+        absolute, delta = merged.get(item.product_id, (None, 0))
+        if item.QT is not None:
+            absolute, delta = item.QT, 0
+        else:
+            delta += item.delta
+        merged[item.product_id] = (absolute, delta)
+    return merged
+
+
+@lru_cache(maxsize=8)
+def stock_update_statement(size: int):
+    """UPDATE ... FROM (VALUES ...) com `size` linhas de parâmetros.
+
+    Escrito como text(): o SQLAlchemy não guarda em cache statements com
+    values(), e recompilar milhares de parâmetros a cada lote custava
+    mais que o próprio UPDATE. Os parâmetros tipados mantêm os casts
+    exigidos pelo asyncpg.
+    """
+    rows = ', '.join(
+        f'(:product_id_{i}, :absolute_{i}, :delta_{i})' for i in range(size)
+    )
+    new_quantity = (
+        'COALESCE(CAST(adjustments.absolute AS INTEGER), products."QT") '
+        '+ adjustments.delta'
+    )
+    return text(
+        f'WITH adjustments(product_id, absolute, delta) AS (VALUES {rows}) '
+        f'UPDATE products SET "QT" = {new_quantity} '
+        'FROM adjustments '
+        'WHERE products.id = adjustments.product_id '
+        'AND products.user_id = :owner_id '
+        f'AND {new_quantity} >= 0 '
+        'RETURNING products.id'
+    ).bindparams(
+        *(
+            bindparam(f'{name}_{i}', type_=Integer)
+            for i in range(size)
+            for name in ('product_id', 'absolute', 'delta')
+        ),
+        bindparam('owner_id', type_=Integer),
+    )
+
+
+def adjust_stock(
+    session: Session,
+    user_id: int,
+    items: list[schemas.StockAdjustment],
+    batch_size: int,
+) -> schemas.StockAdjustmentResult:
+    """Aplica os ajustes numa única transação.
+
+    Cada lote vira um UPDATE products ... FROM (VALUES ...) filtrado por
+    user_id, que só altera linhas cujo estoque final não fica negativo e
+    devolve (RETURNING) os ids atualizados.
+    """
+    products = models.Product.__table__
+    merged = merge_adjustments(items)
+    updated, missing, rejected = [], [], []
+
+    for batch in _batches(sorted(merged.items()), batch_size):
+        ids = [product_id for product_id, _ in batch]
+        owned = set(session.scalars(
+            select(products.c.id).where(
+                products.c.user_id == user_id, products.c.id.in_(ids)
+            )
+        ))
+        rows = [
+            (product_id, absolute, delta)
+            for product_id, (absolute, delta) in batch
+            if product_id in owned
+        ]
+        missing.extend(i for i in ids if i not in owned)
+        if not rows:
+            continue
+
+        params = {'owner_id': user_id}
+        for i, row in enumerate(rows):
+            params.update(zip(
+                (f'product_id_{i}', f'absolute_{i}', f'delta_{i}'), row
+            ))
+        changed = set(
+            session.scalars(stock_update_statement(len(rows)), params)
+        )
+        updated.extend(changed)
+        rejected.extend(i for i, _, _ in rows if i not in changed)
+
+    # Sem nenhuma linha alterada a versão fica: ETags e cache continuam
+    if updated:
+        versions.bump(session, user_id)
+        session.commit()
+        product_cache.invalidate(user_id)
+    return schemas.StockAdjustmentResult(
+        updated=len(updated), missing=missing, rejected=rejected
+    )
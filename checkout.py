@@ -0,0 +1,229 @@
+# loja/checkout.py
+from collections import defaultdict
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+import idempotency
+import models
+import rollups
+import schemas
+import versions
+from product_cache import CachedProduct, product_cache
+
+
+def load_cart_products(
+    session: Session, user_id: int, items: list[schemas.SaleItemSchema]
+) -> dict[int, models.Product]:
+    """Carrega todos os produtos do carrinho com um único SELECT ... IN."""
+    products = _select_products(
+        session, user_id, {item.product_id for item in items}
+    )
+    return _require_cart_products(items, products)
+
+
+def quote_cart_products(
+    session: Session, user_id: int, items: list[schemas.SaleItemSchema]
+) -> dict[int, CachedProduct]:
+    """Como load_cart_products, mas servido pelo cache de produtos.
+
+    Só para cotação (create-payment): a venda lê o banco e baixa o
+    estoque com o UPDATE condicional de reserve_stock.
+    """
+    products = product_cache.products(
+        user_id,
+        sorted({item.product_id for item in items}),
+        lambda ids: {
+            product_id: CachedProduct.from_product(product)
+            for product_id, product in _select_products(
+                session, user_id, ids
+            ).items()
+        },
+        version=versions.current(session, user_id),
+    )
+    return _require_cart_products(items, products)
+
+
+def _select_products(
+    session: Session, user_id: int, product_ids
+) -> dict[int, models.Product]:
+    products = session.scalars(
+        select(models.Product).where(
+            models.Product.user_id == user_id,
+            models.Product.id.in_(product_ids),
+        )
+    ).all()
+    return {product.id: product for product in products}
+
+
+def _require_cart_products(items, products_by_id: dict):
+    for item in items:
+        if item.product_id not in products_by_id:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail=f'Produto com ID {item.product_id} não encontrado',
+            )
+
+    return products_by_id
+
+
+def requested_quantities(
+    items: list[schemas.SaleItemSchema],
+) -> dict[int, int]:
+    """Soma as quantidades pedidas por produto (o carrinho pode repetir
+    IDs)."""
+    quantities = defaultdict(int)
+    for item in items:
+        quantities[item.product_id] += item.QT
+    return dict(quantities)
+
+
+def validate_stock(
+    products: dict[int, models.Product], quantities: dict[int, int]
+):
+    for product_id, quantity in quantities.items():
+        product = products[product_id]
+        if product.QT < quantity:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f'Produto {product.name} não tem estoque suficiente.',
+            )
+
+
+def reserve_stock(
+    session: Session, user_id: int, quantities: dict[int, int]
+) -> bool:
+    """Baixa o estoque do carrinho inteiro de forma atômica.
+
+    Executa UPDATE products SET QT = QT - :n WHERE id = :id AND QT >= :n
+    em lote; a soma das linhas afetadas diz se todos os produtos tinham
+    estoque. Nenhum lock fica preso enquanto o Python valida o carrinho.
+    Retorna False quando algum produto ficou sem estoque; nesse caso cabe
+    ao chamador desfazer a transação.
+    """
+    products = models.Product.__table__
+    statement = (
+        update(products)
+        .where(
+            products.c.id == bindparam('product_id'),
+            products.c.user_id == user_id,
+            products.c.QT >= bindparam('quantity'),
+        )
+        .values(QT=products.c.QT - bindparam('quantity'))
+    )
+    # Ordenar por id evita deadlock entre carrinhos concorrentes
+    params = [
+        {'product_id': product_id, 'quantity': quantity}
+        for product_id, quantity in sorted(quantities.items())
+    ]
+    if not params:
+        return True
+
+    if session.get_bind().dialect.supports_sane_multi_rowcount:
+        updated = session.execute(statement, params).rowcount
+    else:
+        updated = sum(
+            session.execute(statement, row).rowcount for row in params
+        )
+
+    return updated == len(params)
+
+
+def cart_total(
+    products: dict[int, models.Product], items: list[schemas.SaleItemSchema]
+) -> float:
+    return sum(products[item.product_id].price * item.QT for item in items)
+
+
+def place_order(
+    session: Session,
+    user_id: int,
+    items: list[schemas.SaleItemSchema],
+    idempotency_key: str | None = None,
+) -> schemas.SalePublic:
+    """Registra a venda inteira em uma única transação.
+
+    Os produtos são lidos com uma consulta só, o estoque é validado em
+    memória e baixado com um UPDATE condicional em lote, e a venda é
+    inserida com INSERT ... RETURNING seguida de um INSERT em lote para
+    todos os itens. Os rollups diários são atualizados na mesma transação.
+
+    Com idempotency_key, a chave é reservada antes de tudo; uma repetição
+    devolve a resposta da primeira execução sem baixar estoque.
+    """
+    if idempotency_key is not None:
+        stored = idempotency.claim(
+            session,
+            user_id,
+            idempotency_key,
+            idempotency.fingerprint(schemas.SaleSchema(items=items)),
+        )
+        if stored is not None:
+            session.rollback()
+            return schemas.SalePublic.model_validate(stored)
+
+    try:
+        products = load_cart_products(session, user_id, items)
+        quantities = requested_quantities(items)
+        validate_stock(products, quantities)
+    except HTTPException:
+        # Desfaz também a reserva da Idempotency-Key: o cliente pode
+        # repetir o pedido depois de corrigir o carrinho
+        session.rollback()
+        raise
+
+    if not reserve_stock(session, user_id, quantities):
+        session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Estoque insuficiente para um ou mais produtos.',
+        )
+
+    db_sale = models.Sale(
+        user_id=user_id, total_price=cart_total(products, items)
+    )
+    session.add(db_sale)
+    session.flush()
+
+    if items:
+        session.execute(
+            insert(models.SaleItem),
+            [
+                {
+                    'sale_id': db_sale.id,
+                    'product_id': item.product_id,
+                    'QT': item.QT,
+                    'product_price': products[item.product_id].price,
+                }
+                for item in items
+            ],
+        )
+
+    rollups.record_sale(
+        session,
+        user_id,
+        db_sale.created_at,
+        db_sale.total_price,
+        [
+            (item.product_id, item.QT, products[item.product_id].price)
+            for item in items
+        ],
+    )
+
+    # Monta a resposta antes do commit para não precisar de um refresh
+    sale_public = schemas.SalePublic.model_validate(db_sale)
+    if idempotency_key is not None:
+        idempotency.store(
+            session,
+            user_id,
+            idempotency_key,
+            sale_public.model_dump(mode='json'),
+        )
+    versions.bump(session, user_id)
+    session.commit()
+    # O estoque mudou: cotações e páginas do catálogo em cache expiram
+    product_cache.invalidate(user_id)
+
+    return sale_public
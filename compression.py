@@ -0,0 +1,81 @@
+# loja/compression.py
+"""Compressão das respostas da API: br quando o cliente aceita, senão gzip.
+
+brotli é dependência do projeto; se faltar no ambiente o middleware
+continua funcionando só com gzip (e o build de assets.py não grava .br).
+
+Estende o GZipMiddleware do Starlette, que já cuida do tamanho mínimo,
+das respostas em streaming e de não recomprimir o que chega com
+Content-Encoding (os arquivos pré-comprimidos de assets.py).
+"""
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import (
+    GZipMiddleware,
+    GZipResponder,
+    IdentityResponder,
+)
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - fallback para gzip
+    brotli = None
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Codificações de um Accept-Encoding, sem as marcadas com q=0."""
+    accepted = set()
+    for part in header.lower().split(','):
+        encoding, _, params = part.partition(';')
+        quality = params.strip().removeprefix('q=')
+        if encoding.strip() and quality not in {'0', '0.0', '0.00', '0.000'}:
+            accepted.add(encoding.strip())
+    return accepted
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = 'br'
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # flush() entrega cada pedaço do streaming sem esperar o fim
+        compressed = self.compressor.process(body)
+        if more_body:
+            return compressed + self.compressor.flush()
+        return compressed + self.compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        super().__init__(app, minimum_size, compresslevel=gzip_level)
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':  # pragma: no cover
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(
+            Headers(scope=scope).get('accept-encoding', '')
+        )
+        if brotli is not None and 'br' in accepted:
+            responder = BrotliResponder(
+                self.app, self.minimum_size, self.brotli_quality
+            )
+        elif 'gzip' in accepted:
+            responder = GZipResponder(
+                self.app, self.minimum_size, compresslevel=self.compresslevel
+            )
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+
+        await responder(scope, receive, send)
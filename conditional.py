@@ -0,0 +1,34 @@
+# loja/conditional.py
+"""Validação de GET condicional (If-None-Match / If-Modified-Since).
+
+Só compara os cabeçalhos do request com os da resposta; não sabe de onde
+vem o ETag. Serve tanto às rotas da API (versions, com a versão do
+usuário no banco) quanto às páginas pré-renderizadas (pages), que não
+dependem do banco.
+"""
+from email.utils import parsedate_to_datetime
+
+from fastapi import Request
+
+
+def _opaque(etag: str) -> str:
+    return etag.strip().removeprefix('W/')
+
+
+def is_fresh(request: Request, headers: dict) -> bool:
+    """Se o cliente já tem a representação descrita em headers."""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = {_opaque(tag) for tag in if_none_match.split(',')}
+        return '*' in tags or _opaque(headers['ETag']) in tags
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and 'Last-Modified' in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return parsedate_to_datetime(headers['Last-Modified']) <= since
+    return False
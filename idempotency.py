@@ -0,0 +1,147 @@
+# loja/idempotency.py
+"""Idempotency-Key no POST /sales/.
+
+Clientes de PDV repetem a venda quando a resposta não chega. Com o
+cabeçalho Idempotency-Key, a primeira coisa que a transação da venda faz
+é inserir a chave em idempotency_keys; a resposta é gravada na mesma
+linha antes do commit. Uma repetição encontra a chave e recebe a
+resposta guardada, sem tocar no estoque.
+
+Repetições concorrentes se resolvem no banco: o INSERT da segunda
+espera a transação da primeira (índice único) e, quando ela termina, lê
+a resposta já gravada; se a primeira falhou, a chave foi desfeita junto
+com ela e a segunda executa a venda normalmente.
+
+Chaves expiram após IDEMPOTENCY_KEY_TTL_HOURS. Para apagar as antigas:
+
+    python -m idempotency purge
+"""
+import argparse
+import hashlib
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from rollups import UPSERT_DIALECTS
+from settings import get_settings
+
+settings = get_settings()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _expired_before() -> datetime:
+    return _now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def fingerprint(payload: BaseModel) -> str:
+    """Hash do corpo do pedido; a mesma chave com outro corpo é erro."""
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+def claim(
+    session: Session, user_id: int, key: str, request_hash: str
+) -> dict | None:
+    """Reserva a chave na transação atual.
+
+    Retorna None quando o pedido deve ser executado, ou a resposta
+    guardada quando é uma repetição.
+    """
+    table = models.IdempotencyKey.__table__
+    now = _now()
+    row = {
+        'user_id': user_id,
+        'key': key,
+        'fingerprint': request_hash,
+        'created_at': now,
+    }
+    dialect_insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+
+    if dialect_insert is not None:
+        claimed = session.execute(
+            dialect_insert(table)
+            .values(row)
+            .on_conflict_do_nothing(index_elements=['user_id', 'key'])
+        ).rowcount
+    else:
+        try:
+            with session.begin_nested():
+                session.execute(insert(table).values(row))
+            claimed = 1
+        except IntegrityError:
+            claimed = 0
+    if claimed:
+        return None
+
+    # Chave vencida: reaproveita a linha como se fosse nova
+    reclaimed = session.execute(
+        update(table)
+        .where(
+            table.c.user_id == user_id,
+            table.c.key == key,
+            table.c.created_at < _expired_before(),
+        )
+        .values(fingerprint=request_hash, response=None, created_at=now)
+    ).rowcount
+    if reclaimed:
+        return None
+
+    stored = session.execute(
+        select(table.c.fingerprint, table.c.response).where(
+            table.c.user_id == user_id, table.c.key == key
+        )
+    ).one()
+    if stored.fingerprint != request_hash:
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail='Idempotency-Key já usada em outro pedido',
+        )
+    if stored.response is None:
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail='Pedido com esta Idempotency-Key ainda em andamento',
+        )
+    return stored.response
+
+
+def store(session: Session, user_id: int, key: str, response: dict):
+    """Grava a resposta na linha reservada por claim (antes do commit)."""
+    table = models.IdempotencyKey.__table__
+    session.execute(
+        update(table)
+        .where(table.c.user_id == user_id, table.c.key == key)
+        .values(response=response)
+    )
+
+
+def purge_expired(session: Session) -> int:
+    table = models.IdempotencyKey.__table__
+    deleted = session.execute(
+        delete(table).where(table.c.created_at < _expired_before())
+    ).rowcount
+    session.commit()
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('command', choices=['purge'])
+    parser.parse_args()
+
+    from DB import get_engine
+
+    with Session(get_engine()) as session:
+        rows = purge_expired(session)
+    print(f'{rows} chaves removidas de idempotency_keys')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,27 @@
 # loja/main.py
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 from routers import users, auth, products, sales
 from schemas import Message
+from settings import get_settings
+import DB
+import assets
+import pages
+import security
+from compression import CompressionMiddleware
+from product_cache import product_cache
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Páginas HTML renderizadas uma vez, antes do primeiro acesso
+    pages.static_pages.prerender()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "*",
@@ -21,47 +35,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.mount('/static', StaticFiles(directory='static'), name='static')
-templates = Jinja2Templates(directory='templates')
+settings = get_settings()
+
+# gzip/br nas respostas da API; os arquivos de static/dist já vão
+# pré-comprimidos e passam direto pelo middleware
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
 
-app.include_router(users.router)
-app.include_router(auth.router)
-app.include_router(products.router)
-app.include_router(sales.router)
+app.mount(
+    '/static',
+    assets.PrecompressedStaticFiles(directory='static'),
+    name='static',
+)
+
+if settings.ASYNC_DB:
+    from routers import aio
+
+    app.include_router(aio.users_router)
+    app.include_router(aio.auth_router)
+    app.include_router(aio.products_router)
+    app.include_router(aio.sales_router)
+else:
+    app.include_router(users.router)
+    app.include_router(auth.router)
+    app.include_router(products.router)
+    app.include_router(sales.router)
+
+@app.get(
+    '/metrics',
+    status_code=HTTPStatus.OK,
+    dependencies=[Depends(security.require_metrics_token)],
+)
+def metrics():
+    return {
+        'db_pool': DB.pool_metrics.snapshot(DB.active_pool()),
+        'user_cache': security.user_cache.stats(),
+        'token_cache': security.token_cache.stats(),
+        'product_cache': product_cache.stats(),
+        'hashing': security.hashing_pool.stats(),
+    }
 
 @app.get('/', status_code=HTTPStatus.OK)
 def home(request: Request):
-    return templates.TemplateResponse('home.html', {'request': request})
+    return pages.static_pages.response(request, 'home.html')
 
 @app.get('/login', status_code=HTTPStatus.OK)
 def login_page(request: Request):
-    return templates.TemplateResponse('login.html', {'request': request})
+    return pages.static_pages.response(request, 'login.html')
 
 @app.get('/register', status_code=HTTPStatus.OK)
 def register_page(request: Request):
-    return templates.TemplateResponse('register.html', {'request': request})
+    return pages.static_pages.response(request, 'register.html')
 
 # A rota abaixo foi alterada de '/products' para '/products-page'
 @app.get('/products-page', status_code=HTTPStatus.OK)
 def products_page(request: Request):
-    return templates.TemplateResponse('products.html', {'request': request})
+    return pages.static_pages.response(request, 'products.html')
 
 @app.get('/create-product-page', status_code=HTTPStatus.OK)
 def create_product_page(request: Request):
-    return templates.TemplateResponse('create_product.html', {'request': request})
+    return pages.static_pages.response(request, 'create_product.html')
 
 @app.get('/update-product-page', status_code=HTTPStatus.OK)
 def update_product_page(request: Request):
-    return templates.TemplateResponse('update_product.html', {'request': request})
+    return pages.static_pages.response(request, 'update_product.html')
 
 @app.get('/delete-product-page', status_code=HTTPStatus.OK)
 def delete_product_page(request: Request):
-    return templates.TemplateResponse('delete_product.html', {'request': request})
+    return pages.static_pages.response(request, 'delete_product.html')
 
 @app.get('/sales', status_code=HTTPStatus.OK)
 def sales_page(request: Request):
-    return templates.TemplateResponse('sales.html', {'request': request})
+    return pages.static_pages.response(request, 'sales.html')
 
 @app.get('/accounting', status_code=HTTPStatus.OK)
 def accounting_page(request: Request):
-    return templates.TemplateResponse('accounting.html', {'request': request})
\ No newline at end of file
+    return pages.static_pages.response(request, 'accounting.html')
\ No newline at end of file
@@ -4,13 +4,13 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
-from settings import Settings
+from settings import get_settings
 from models import table_registry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option('sqlalchemy.url',Settings().DATABASE_URL)
+config.set_main_option('sqlalchemy.url',get_settings().DATABASE_URL)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -23,6 +23,20 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = table_registry.metadata
 
+# Estruturas de busca por nome criadas à mão pela migração 74f10cbac597:
+# a tabela FTS5 do SQLite (e as tabelas-sombra products_fts_*) não está no
+# metadata, e o índice de trigramas só existe no PostgreSQL. Sem este
+# filtro o autogenerate proporia removê-las ou criá-las no banco errado.
+MANUAL_SEARCH_INDEX = 'ix_products_name_trgm'
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith('products_fts'):
+        return False
+    if type_ == 'index' and name == MANUAL_SEARCH_INDEX:
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -45,6 +59,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -68,7 +83,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,74 @@
+"""Índice de busca por nome de produto
+
+Revision ID: 74f10cbac597
+Revises: 2454e19b8bbd
+Create Date: 2026-10-18 10:12:41.220931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '74f10cbac597'
+down_revision: Union[str, Sequence[str], None] = '2454e19b8bbd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, content='products', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products
+    BEGIN
+        INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products
+    BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name)
+        VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au
+    AFTER UPDATE OF name ON products
+    BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name)
+        VALUES ('delete', old.id, old.name);
+        INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    # Indexa os produtos que já existem
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_products_name_trgm',
+            'products',
+            ['name'],
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+        )
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_products_name_trgm', table_name='products')
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS products_fts_ai')
+        op.execute('DROP TRIGGER IF EXISTS products_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS products_fts_au')
+        op.execute('DROP TABLE IF EXISTS products_fts')
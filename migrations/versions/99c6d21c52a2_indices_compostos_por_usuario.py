@@ -0,0 +1,42 @@
+"""Índices compostos por usuário
+
+Revision ID: 99c6d21c52a2
+Revises: 74f10cbac597
+Create Date: 2026-10-18 11:03:27.514208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '99c6d21c52a2'
+down_revision: Union[str, Sequence[str], None] = '74f10cbac597'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_products_user_id_id', 'products', ['user_id', 'id']
+    )
+    op.create_index(
+        'ix_sales_user_id_created_at', 'sales', ['user_id', 'created_at']
+    )
+    op.create_index('ix_sale_items_sale_id', 'sale_items', ['sale_id'])
+    op.create_index(
+        'ix_sale_items_product_id_sale_id',
+        'sale_items',
+        ['product_id', 'sale_id'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sale_items_product_id_sale_id', table_name='sale_items')
+    op.drop_index('ix_sale_items_sale_id', table_name='sale_items')
+    op.drop_index('ix_sales_user_id_created_at', table_name='sales')
+    op.drop_index('ix_products_user_id_id', table_name='products')
@@ -0,0 +1,41 @@
+"""Versão inicial de todos os usuários
+
+Revision ID: ca7c3c8d5799
+Revises: 52b96587321a
+Create Date: 2026-10-18 19:02:37.512803
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ca7c3c8d5799'
+down_revision: Union[str, Sequence[str], None] = '52b96587321a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # O cache de identidade (security.user_cache) só guarda usuários com
+    # linha em tenant_versions; create_user já cria a linha, aqui ela é
+    # criada para as contas existentes.
+    op.execute(
+        """
+        INSERT INTO tenant_versions (user_id, version, changed_at)
+        SELECT users.id, 1, CURRENT_TIMESTAMP
+        FROM users
+        WHERE NOT EXISTS (
+            SELECT 1 FROM tenant_versions
+            WHERE tenant_versions.user_id = users.id
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # As linhas continuam válidas para os ETags; nada a desfazer
+    pass
@@ -1,7 +1,7 @@
 # loja/models.py
-from datetime import datetime
+from datetime import date, datetime
 from sqlalchemy.orm import Mapped, registry, mapped_column
-from sqlalchemy import func, ForeignKey
+from sqlalchemy import DDL, JSON, event, func, ForeignKey, Index, String
 
 table_registry = registry()
 
@@ -22,6 +22,7 @@ class User:
 @table_registry.mapped_as_dataclass
 class Product:
     __tablename__ = 'products'
+    __table_args__ = (Index('ix_products_user_id_id', 'user_id', 'id'),)
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
@@ -31,9 +32,64 @@ class Product:
     QT: Mapped[int]
 
 
+# Busca por nome: índice GIN de trigramas no PostgreSQL e uma tabela FTS5
+# (tokenizer trigram) espelhando products.name no SQLite. As mesmas
+# estruturas são criadas pela migração 74f10cbac597.
+Index(
+    'ix_products_name_trgm',
+    Product.name,
+    postgresql_using='gin',
+    postgresql_ops={'name': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
+
+PRODUCTS_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, content='products', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products
+    BEGIN
+        INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products
+    BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name)
+        VALUES ('delete', old.id, old.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au
+    AFTER UPDATE OF name ON products
+    BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name)
+        VALUES ('delete', old.id, old.name);
+        INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+    END""",
+]
+
+event.listen(
+    Product.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+        dialect='postgresql'
+    ),
+)
+for statement in PRODUCTS_FTS_DDL:
+    event.listen(
+        Product.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+event.listen(
+    Product.__table__,
+    'after_drop',
+    DDL('DROP TABLE IF EXISTS products_fts').execute_if(dialect='sqlite'),
+)
+
+
 @table_registry.mapped_as_dataclass
 class Sale:
     __tablename__ = 'sales'
+    __table_args__ = (
+        Index('ix_sales_user_id_created_at', 'user_id', 'created_at'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
@@ -46,9 +102,105 @@ class Sale:
 @table_registry.mapped_as_dataclass
 class SaleItem:
     __tablename__ = 'sale_items'
+    __table_args__ = (
+        Index('ix_sale_items_sale_id', 'sale_id'),
+        Index('ix_sale_items_product_id_sale_id', 'product_id', 'sale_id'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     sale_id: Mapped[int] = mapped_column(ForeignKey('sales.id'))
     product_id: Mapped[int] = mapped_column(ForeignKey('products.id'))
     QT: Mapped[int]
-    product_price: Mapped[float]
\ No newline at end of file
+    product_price: Mapped[float]
+
+
+@table_registry.mapped_as_dataclass
+class DailySalesRollup:
+    """Vendas pré-agregadas por usuário, dia (no STORE_TIMEZONE) e produto.
+
+    Mantida dentro da transação do checkout; rollups.backfill reconstrói.
+    """
+    __tablename__ = 'daily_sales_rollup'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id'), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey('products.id', ondelete='CASCADE'), primary_key=True
+    )
+    qty: Mapped[int]
+    revenue: Mapped[float]
+    sale_count: Mapped[int]
+
+
+@table_registry.mapped_as_dataclass
+class DailySalesTotals:
+    """Total de vendas por usuário e dia; uma venda com vários produtos
+    conta uma vez só aqui, o que a tabela por produto não consegue dizer."""
+    __tablename__ = 'daily_sales_totals'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id'), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    sale_count: Mapped[int]
+    revenue: Mapped[float]
+
+
+@table_registry.mapped_as_dataclass
+class ProductLeaderboard:
+    """Quantidade e receita acumuladas por usuário e produto.
+
+    Atualizada pelo checkout e ao excluir produtos; o índice
+    (user_id, qty) entrega o top N sem agrupar o histórico de vendas.
+    """
+    __tablename__ = 'product_leaderboard'
+    __table_args__ = (
+        Index('ix_product_leaderboard_user_id_qty', 'user_id', 'qty'),
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id'), primary_key=True
+    )
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey('products.id', ondelete='CASCADE'), primary_key=True
+    )
+    qty: Mapped[int]
+    revenue: Mapped[float]
+
+
+@table_registry.mapped_as_dataclass
+class TenantVersion:
+    """Versão dos produtos, das vendas e da conta de um usuário.
+
+    Incrementada na mesma transação de cada escrita (versions.bump); é o
+    que compõe o ETag e o Last-Modified das leituras do catálogo e dos
+    relatórios, e o que invalida a identidade em security.user_cache em
+    todos os workers.
+    """
+    __tablename__ = 'tenant_versions'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int]
+    changed_at: Mapped[datetime]
+
+
+@table_registry.mapped_as_dataclass
+class IdempotencyKey:
+    """Idempotency-Key de uma venda e a resposta devolvida a ela.
+
+    A linha é inserida no início da transação da venda e recebe a
+    resposta antes do commit (ver idempotency.py).
+    """
+    __tablename__ = 'idempotency_keys'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    created_at: Mapped[datetime]
+    response: Mapped[dict | None] = mapped_column(JSON, default=None)
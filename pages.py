@@ -0,0 +1,105 @@
+# loja/pages.py
+"""Páginas HTML do painel (templates/).
+
+As páginas são cascas estáticas: o contexto é só o request, e os dados
+vêm depois pelo api.js. Por isso cada template é renderizado uma vez (na
+subida do app, em prerender) e fica em memória já com a versão gzip e um
+ETag; a rota só escolhe a variante e responde 304 quando o navegador já
+tem a página. O ambiente Jinja usa cache de bytecode em disco, então
+nem a compilação dos templates se repete entre reinícios e workers.
+
+Depois de rodar python -m assets com o app no ar, chame
+static_pages.clear() (ou reinicie) para os links apontarem aos novos
+arquivos.
+"""
+import gzip
+import hashlib
+import threading
+from dataclasses import dataclass
+from http import HTTPStatus
+from pathlib import Path
+
+from fastapi import Request, Response
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+import assets
+from compression import accepted_encodings
+from conditional import is_fresh
+
+TEMPLATES_DIR = Path(__file__).parent / 'templates'
+
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        bytecode_cache=FileSystemBytecodeCache(),
+    )
+)
+templates.env.globals['asset'] = assets.url
+
+
+@dataclass(frozen=True)
+class RenderedPage:
+    body: bytes
+    gzipped: bytes
+    etag: str
+
+    @classmethod
+    def from_html(cls, html: str) -> 'RenderedPage':
+        body = html.encode()
+        return cls(
+            body=body,
+            gzipped=gzip.compress(body, compresslevel=9, mtime=0),
+            etag=hashlib.sha256(body).hexdigest()[:16],
+        )
+
+
+class StaticPages:
+    def __init__(self, env: Environment):
+        self.env = env
+        self._pages: dict[str, RenderedPage] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> RenderedPage:
+        page = self._pages.get(name)
+        if page is None:
+            page = RenderedPage.from_html(
+                self.env.get_template(name).render()
+            )
+            with self._lock:
+                self._pages[name] = page
+        return page
+
+    def prerender(self):
+        for name in self.env.list_templates(extensions=['html']):
+            self.get(name)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def response(self, request: Request, name: str) -> Response:
+        page = self.get(name)
+        compressed = 'gzip' in accepted_encodings(
+            request.headers.get('accept-encoding', '')
+        )
+        # Um ETag por representação: a versão gzip tem o seu
+        headers = {
+            'ETag': f'"{page.etag}-gzip"' if compressed else f'"{page.etag}"',
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+        if is_fresh(request, headers):
+            return Response(
+                status_code=HTTPStatus.NOT_MODIFIED, headers=headers
+            )
+        if compressed:
+            headers['Content-Encoding'] = 'gzip'
+            return Response(
+                page.gzipped, media_type='text/html', headers=headers
+            )
+        return Response(page.body, media_type='text/html', headers=headers)
+
+
+static_pages = StaticPages(templates.env)
@@ -0,0 +1,163 @@
+# loja/product_cache.py
+"""Cache read-through de produtos, separado por usuário (tenant).
+
+Guarda produtos por id (usados na cotação do carrinho) e páginas do
+catálogo (GET /products/). Toda chave inclui a geração atual do
+usuário; qualquer escrita em produtos chama invalidate(user_id), que
+troca a geração e torna inalcançáveis todas as entradas antigas daquele
+usuário sem precisar listá-las.
+
+A geração é lida antes da consulta ao banco, então um resultado lido
+antes de uma escrita concorrente fica gravado sob a geração antiga e
+nunca é servido depois da invalidação.
+
+A geração é local ao processo. Com vários workers (python -m server), quem
+chama inclui também a versão do usuário em tenant_versions (versions.py),
+que toda escrita incrementa no banco: assim uma escrita feita em outro
+worker também torna as entradas antigas inalcançáveis.
+"""
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+import cache
+from settings import get_settings
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CachedProduct:
+    """Cópia de models.Product desacoplada da sessão."""
+
+    id: int
+    user_id: int
+    name: str
+    description: str | None
+    price: float
+    QT: int
+
+    @classmethod
+    def from_product(cls, product) -> 'CachedProduct':
+        return cls(
+            id=product.id,
+            user_id=product.user_id,
+            name=product.name,
+            description=product.description,
+            price=product.price,
+            QT=product.QT,
+        )
+
+
+class ProductCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: int) -> int:
+        key = ('generation', user_id)
+        generation = self.backend.get(key)
+        if generation is None:
+            # Nunca reaproveita uma geração: se a entrada sumiu (LRU ou
+            # reinício do backend) começa uma nova
+            generation = time.time_ns()
+            self.backend.set(key, generation, expires_at=float('inf'))
+        return generation
+
+    def invalidate(self, user_id: int):
+        self.backend.set(
+            ('generation', user_id), time.time_ns(), expires_at=float('inf')
+        )
+        with self._lock:
+            self.invalidations += 1
+
+    def _get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        stored_at, value = entry
+        age = time.time() - stored_at
+        with self._lock:
+            self.hits += 1
+            self._served_age_total += age
+            self._served_age_max = max(self._served_age_max, age)
+        return value
+
+    def _set(self, key, value):
+        self.backend.set(key, (time.time(), value))
+
+    def read_through(self, user_id: int, key: tuple, loader):
+        """Valor de loader() guardado sob (usuário, geração, key).
+
+        Exceções de loader (um 404, por exemplo) não são guardadas.
+        """
+        full_key = ('page', user_id, self.generation(user_id), *key)
+        value = self._get(full_key)
+        if value is None:
+            value = loader()
+            self._set(full_key, value)
+        return value
+
+    def products(
+        self, user_id: int, product_ids, loader, version: int = 0
+    ) -> dict[int, CachedProduct]:
+        """Produtos do usuário por id; loader(ids_faltando) consulta o
+        banco e devolve {id: CachedProduct} só com os que existem."""
+        generation = (self.generation(user_id), version)
+        found, missing = {}, []
+        for product_id in product_ids:
+            data = self._get(('product', user_id, generation, product_id))
+            if data is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = CachedProduct(**data)
+
+        if missing:
+            loaded = loader(missing)
+            for product_id, product in loaded.items():
+                self._set(
+                    ('product', user_id, generation, product_id),
+                    asdict(product),
+                )
+            found.update(loaded)
+        return found
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+            self._served_age_total = self._served_age_max = 0.0
+
+    def stats(self) -> dict:
+        """Tamanho e evicções vêm do backend; acertos, erros e idade das
+        entradas servidas (quanto tempo desde que saíram do banco) contam
+        só leituras de produtos e páginas, não as de geração."""
+        lookups = self.hits + self.misses
+        stats = self.backend.stats()
+        stats.update(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+            invalidations=self.invalidations,
+            served_age_avg_s=(
+                self._served_age_total / self.hits if self.hits else 0.0
+            ),
+            served_age_max_s=self._served_age_max,
+        )
+        return stats
+
+
+product_cache = ProductCache(
+    cache.load_backend(
+        settings.PRODUCT_CACHE_BACKEND,
+        settings.PRODUCT_CACHE_MAX_SIZE,
+        settings.PRODUCT_CACHE_TTL_SECONDS,
+    )
+)
@@ -0,0 +1,290 @@
+# loja/rollups.py
+"""Manutenção das tabelas daily_sales_rollup, daily_sales_totals e
+product_leaderboard.
+
+O checkout chama record_sale na mesma transação da venda. A migração
+d3761f5782e6 popula as tabelas com as vendas existentes; depois de mudar
+STORE_TIMEZONE rode:
+
+    python -m rollups backfill [--user-id ID]
+"""
+import argparse
+from collections import defaultdict
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import (
+    Date,
+    cast,
+    delete,
+    distinct,
+    func,
+    insert,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+import versions
+from DB import get_engine
+from settings import get_settings
+
+settings = get_settings()
+
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def local_day(moment: datetime, tz: ZoneInfo | None = None) -> date:
+    """Dia da loja para um created_at (gravado em UTC, sem fuso)."""
+    tz = tz or ZoneInfo(settings.STORE_TIMEZONE)
+    return moment.replace(tzinfo=ZoneInfo('UTC')).astimezone(tz).date()
+
+
+def _upsert(session: Session, table, keys: list[str], rows: list[dict]):
+    """INSERT ... ON CONFLICT DO UPDATE somando os contadores."""
+    counters = [c for c in rows[0] if c not in keys]
+    dialect_insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+
+    if dialect_insert is None:
+        for row in rows:
+            updated = session.execute(
+                update(table)
+                .where(*(table.c[k] == row[k] for k in keys))
+                .values({c: table.c[c] + row[c] for c in counters})
+            ).rowcount
+            if not updated:
+                session.execute(insert(table).values(row))
+        return
+
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={c: table.c[c] + statement.excluded[c] for c in counters},
+    )
+    session.execute(statement, rows)
+
+
+def record_sale(
+    session: Session,
+    user_id: int,
+    created_at: datetime,
+    total_price: float,
+    lines: list[tuple[int, int, float]],
+):
+    """Soma uma venda nas tabelas de rollup.
+
+    lines são tuplas (product_id, quantidade, preço unitário).
+    """
+    day = local_day(created_at)
+    per_product = defaultdict(lambda: [0, 0.0])
+    for product_id, quantity, price in lines:
+        per_product[product_id][0] += quantity
+        per_product[product_id][1] += quantity * price
+
+    if per_product:
+        _upsert(
+            session,
+            models.ProductLeaderboard.__table__,
+            ['user_id', 'product_id'],
+            [
+                {
+                    'user_id': user_id,
+                    'product_id': product_id,
+                    'qty': qty,
+                    'revenue': revenue,
+                }
+                for product_id, (qty, revenue) in sorted(per_product.items())
+            ],
+        )
+        _upsert(
+            session,
+            models.DailySalesRollup.__table__,
+            ['user_id', 'day', 'product_id'],
+            [
+                {
+                    'user_id': user_id,
+                    'day': day,
+                    'product_id': product_id,
+                    'qty': qty,
+                    'revenue': revenue,
+                    'sale_count': 1,
+                }
+                for product_id, (qty, revenue) in sorted(per_product.items())
+            ],
+        )
+
+    _upsert(
+        session,
+        models.DailySalesTotals.__table__,
+        ['user_id', 'day'],
+        [{
+            'user_id': user_id,
+            'day': day,
+            'sale_count': 1,
+            'revenue': total_price,
+        }],
+    )
+
+
+def forget_product(session: Session, product_id: int):
+    """Remove o produto dos rollups antes de excluí-lo.
+
+    O ON DELETE CASCADE cobre o PostgreSQL, mas o SQLite só respeita
+    chaves estrangeiras com PRAGMA foreign_keys ligado.
+    """
+    for model in (models.ProductLeaderboard, models.DailySalesRollup):
+        session.execute(delete(model).where(model.product_id == product_id))
+
+
+def _local_day_column(session: Session, created_at):
+    """Dia da loja para created_at calculado no próprio banco."""
+    dialect_name = session.get_bind().dialect.name
+    if dialect_name == 'postgresql':
+        return cast(
+            func.timezone(
+                settings.STORE_TIMEZONE, func.timezone('UTC', created_at)
+            ),
+            Date,
+        )
+    if dialect_name == 'sqlite':
+        # O SQLite não conhece fusos IANA: a conversão fica numa função
+        # Python registrada na conexão desta transação
+        tz = ZoneInfo(settings.STORE_TIMEZONE)
+        session.connection().connection.driver_connection.create_function(
+            'store_local_day',
+            1,
+            lambda value: local_day(
+                datetime.fromisoformat(value), tz
+            ).isoformat(),
+            deterministic=True,
+        )
+        return func.store_local_day(created_at)
+    return cast(created_at, Date)
+
+
+def _lock_rollups(session: Session):
+    """Bloqueia as escritas de record_sale até o commit do backfill.
+
+    No PostgreSQL o modo EXCLUSIVE ainda deixa os relatórios lerem. No
+    SQLite a transação de escrita já é exclusiva.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text(
+            'LOCK TABLE daily_sales_rollup, daily_sales_totals, '
+            'product_leaderboard IN EXCLUSIVE MODE'
+        ))
+
+
+def backfill(session: Session, user_id: int | None = None) -> int:
+    """Reconstrói os rollups a partir de sales/sale_items.
+
+    Tudo numa transação, com INSERT ... SELECT agregado no banco. As
+    tabelas ficam bloqueadas para record_sale até o commit: uma venda
+    concluída antes do bloqueio entra na agregação, e uma concluída
+    depois soma por cima do resultado, sem perder nem contar duas vezes.
+    No fim incrementa a versão dos usuários afetados, para que os ETags
+    dos relatórios mudem.
+
+    Retorna o número de linhas gravadas em daily_sales_rollup.
+    """
+    _lock_rollups(session)
+    user_filter = [] if user_id is None else [models.Sale.user_id == user_id]
+
+    for model in (
+        models.DailySalesRollup,
+        models.DailySalesTotals,
+        models.ProductLeaderboard,
+    ):
+        condition = [] if user_id is None else [model.user_id == user_id]
+        session.execute(delete(model).where(*condition))
+
+    lines = (
+        select(
+            models.Sale.id.label('sale_id'),
+            models.Sale.user_id,
+            _local_day_column(session, models.Sale.created_at).label('day'),
+            models.SaleItem.product_id,
+            models.SaleItem.QT.label('qty'),
+            models.SaleItem.product_price.label('price'),
+        )
+        .join(models.SaleItem, models.SaleItem.sale_id == models.Sale.id)
+        .where(*user_filter)
+        .subquery()
+    )
+    rows = session.execute(
+        insert(models.DailySalesRollup).from_select(
+            ['user_id', 'day', 'product_id', 'qty', 'revenue', 'sale_count'],
+            select(
+                lines.c.user_id,
+                lines.c.day,
+                lines.c.product_id,
+                func.sum(lines.c.qty),
+                func.sum(lines.c.qty * lines.c.price),
+                func.count(distinct(lines.c.sale_id)),
+            ).group_by(lines.c.user_id, lines.c.day, lines.c.product_id),
+        )
+    ).rowcount
+
+    rollup = models.DailySalesRollup
+    session.execute(
+        insert(models.ProductLeaderboard).from_select(
+            ['user_id', 'product_id', 'qty', 'revenue'],
+            select(
+                rollup.user_id,
+                rollup.product_id,
+                func.sum(rollup.qty),
+                func.sum(rollup.revenue),
+            )
+            .where(*([] if user_id is None else [rollup.user_id == user_id]))
+            .group_by(rollup.user_id, rollup.product_id),
+        )
+    )
+
+    sales = (
+        select(
+            models.Sale.user_id,
+            _local_day_column(session, models.Sale.created_at).label('day'),
+            models.Sale.total_price,
+        )
+        .where(*user_filter)
+        .subquery()
+    )
+    session.execute(
+        insert(models.DailySalesTotals).from_select(
+            ['user_id', 'day', 'sale_count', 'revenue'],
+            select(
+                sales.c.user_id,
+                sales.c.day,
+                func.count(),
+                func.sum(sales.c.total_price),
+            ).group_by(sales.c.user_id, sales.c.day),
+        )
+    )
+
+    if user_id is None:
+        versions.bump_all(session)
+    else:
+        versions.bump(session, user_id)
+    session.commit()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('command', choices=['backfill'])
+    parser.add_argument('--user-id', type=int, default=None)
+    args = parser.parse_args()
+
+    with Session(get_engine()) as session:
+        rows = backfill(session, args.user_id)
+    print(f'{rows} linhas gravadas em daily_sales_rollup')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,530 @@
+"""Routers assíncronos, incluídos no app quando Settings.ASYNC_DB está ligado.
+
+Produtos e vendas delegam para os handlers síncronos via
+AsyncSession.run_sync: o código roda num greenlet e cada ida ao banco
+devolve o controle ao event loop, então as regras continuam num lugar só.
+Só que o greenlet roda no próprio thread do event loop; trabalho pesado
+de CPU (validar uma importação, agregar com NumPy, serializar relatórios
+grandes) vai para run_in_threadpool, e run_sync fica só com o banco.
+Auth e usuários são escritos aqui porque o hash de senha precisa ser
+aguardado no pool de hashing, e não executado dentro do event loop.
+"""
+from datetime import date
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import catalog
+import DB
+import models
+import schemas
+import security
+import versions
+from routers import products, sales
+
+T_Session = Annotated[AsyncSession, Depends(DB.get_async_session)]
+T_CurrentUser = Annotated[
+    security.AuthenticatedUser,
+    Depends(security.get_authenticated_user_async),
+]
+T_Current_user_row = Annotated[
+    models.User, Depends(security.get_current_user_async)
+]
+
+products_router = APIRouter(prefix='/products', tags=['products'])
+sales_router = APIRouter(prefix='/sales', tags=['sales'])
+users_router = APIRouter(prefix='/users', tags=['users'])
+auth_router = APIRouter(prefix='/auth', tags=['auth'])
+
+
+# Produtos
+
+@products_router.post(
+    '/', status_code=HTTPStatus.CREATED, response_model=schemas.ProductPublic
+)
+async def create_product(
+        product: schemas.ProductSchema,
+        session: T_Session,
+        current_user: T_CurrentUser
+):
+    return await session.run_sync(
+        lambda s: products.create_product(
+            product=product, session=s, current_user=current_user
+        )
+    )
+
+
+@products_router.post('/bulk', response_model=schemas.ProductImportResult)
+async def bulk_import_products(
+        payload: Annotated[tuple[str, bytes], Depends(catalog.import_payload)],
+        session: T_Session,
+        current_user: T_CurrentUser,
+        settings: products.T_Settings,
+):
+    import_format, content = payload
+    valid, errors = await run_in_threadpool(
+        lambda: catalog.validate_rows(
+            catalog.parse_rows(content, import_format)
+        )
+    )
+    return await session.run_sync(
+        catalog.write_products,
+        current_user.id,
+        valid,
+        errors,
+        settings.PRODUCT_IMPORT_BATCH_SIZE,
+    )
+
+
+@products_router.patch('/stock', response_model=schemas.StockAdjustmentResult)
+async def adjust_stock(
+        adjustment: schemas.StockAdjustmentSchema,
+        session: T_Session,
+        current_user: T_CurrentUser,
+        settings: products.T_Settings,
+):
+    return await session.run_sync(
+        lambda s: products.adjust_stock(
+            adjustment=adjustment,
+            session=s,
+            current_user=current_user,
+            settings=settings,
+        )
+    )
+
+
+@products_router.get(
+    '/',
+    response_model=schemas.ProductListResponse,
+    dependencies=[Depends(versions.not_modified_async)]
+)
+async def read_products(
+        response: Response,
+        session: T_Session,
+        current_user: T_CurrentUser,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, gt=0, le=1000),
+        name: str | None = Query(None),
+        product_id: int | None = Query(None),
+        after: str | None = Query(None),
+        include_total: bool | None = Query(None)
+):
+    return await session.run_sync(
+        lambda s: products.read_products(
+            response=response,
+            session=s,
+            current_user=current_user,
+            skip=skip,
+            limit=limit,
+            name=name,
+            product_id=product_id,
+            after=after,
+            include_total=include_total,
+        )
+    )
+
+
+@products_router.put('/{product_id}', response_model=schemas.ProductPublic)
+async def update_product(
+        product_id: int,
+        product: schemas.ProductUpdateSchema,
+        session: T_Session,
+        current_user: T_CurrentUser
+):
+    return await session.run_sync(
+        lambda s: products.update_product(
+            product_id=product_id,
+            product=product,
+            session=s,
+            current_user=current_user,
+        )
+    )
+
+
+@products_router.delete(
+    '/{product_id}',
+    status_code=HTTPStatus.NO_CONTENT,
+    response_model=None
+)
+async def delete_product(
+        product_id: int, session: T_Session, current_user: T_CurrentUser
+):
+    return await session.run_sync(
+        lambda s: products.delete_product(
+            product_id=product_id, session=s, current_user=current_user
+        )
+    )
+
+
+# Vendas
+
+async def load_period_lines(
+    session: AsyncSession,
+    current_user: security.AuthenticatedUser,
+    start_date: date,
+    end_date: date,
+    tz: str | None,
+):
+    return await session.run_sync(
+        lambda s: sales.load_period_lines(
+            s, current_user, start_date, end_date, tz
+        )
+    )
+
+
+@sales_router.get(
+    '/daily_report',
+    response_model=schemas.DailySales,
+    dependencies=[Depends(versions.report_not_modified_async)]
+)
+async def get_daily_sales_report(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        day: date | None = Query(None),
+        end_day: date | None = Query(None),
+        tz: str | None = Query(None)
+):
+    return await session.run_sync(
+        lambda s: sales.get_daily_sales_report(
+            session=s,
+            current_user=current_user,
+            day=day,
+            end_day=end_day,
+            tz=tz,
+        )
+    )
+
+
+@sales_router.get(
+    '/report_by_period',
+    response_model=schemas.SalesByPeriodReport,
+    dependencies=[Depends(versions.report_not_modified_async)]
+)
+async def get_sales_by_period(
+        response: Response,
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date
+):
+    query = sales.period_query(current_user.id, start_date, end_date)
+    rows = (await session.execute(query)).all()
+    return await run_in_threadpool(
+        sales.sales_by_period_response, rows, response
+    )
+
+
+@sales_router.get('/report_by_period/export')
+async def export_sales_by_period(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        export_format: sales.T_ExportFormat = 'ndjson'
+):
+    query = sales.period_query(current_user.id, start_date, end_date)
+    bind = session.bind
+
+    async def chunks():
+        yield sales.export_header(export_format)
+        async with AsyncSession(bind) as stream_session:
+            result = await stream_session.stream(
+                query.execution_options(yield_per=sales.EXPORT_BATCH_SIZE)
+            )
+            async for rows in result.partitions():
+                yield await run_in_threadpool(
+                    sales.encode_export_rows, rows, export_format
+                )
+
+    return sales.export_response(
+        chunks(), export_format, start_date, end_date
+    )
+
+
+@sales_router.get(
+    '/best_selling',
+    response_model=schemas.BestSellingProductsReport,
+    dependencies=[Depends(versions.report_not_modified_async)]
+)
+async def get_best_selling_products(
+        response: Response,
+        session: T_Session,
+        current_user: T_CurrentUser,
+        limit: int = Query(10, gt=0, le=100),
+        days: int | None = Query(None, gt=0, le=366)
+):
+    rows = await session.run_sync(
+        sales.load_best_selling, current_user.id, limit, days
+    )
+    return await run_in_threadpool(
+        sales.best_selling_response, rows, response
+    )
+
+
+@sales_router.get(
+    '/analytics/revenue_by_hour',
+    response_model=schemas.AnalyticsBucketsReport,
+    dependencies=[Depends(versions.report_not_modified_async)]
+)
+async def get_revenue_by_hour(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None)
+):
+    lines = await load_period_lines(
+        session, current_user, start_date, end_date, tz
+    )
+    return await run_in_threadpool(sales.revenue_by_hour_report, lines)
+
+
+@sales_router.get(
+    '/analytics/revenue_by_weekday',
+    response_model=schemas.AnalyticsBucketsReport,
+    dependencies=[Depends(versions.report_not_modified_async)]
+)
+async def get_revenue_by_weekday(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None)
+):
+    lines = await load_period_lines(
+        session, current_user, start_date, end_date, tz
+    )
+    return await run_in_threadpool(sales.revenue_by_weekday_report, lines)
+
+
+@sales_router.get(
+    '/analytics/products',
+    response_model=schemas.ProductAnalyticsReport,
+    dependencies=[Depends(versions.report_not_modified_async)]
+)
+async def get_product_analytics(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None),
+        limit: int = Query(10, gt=0, le=100)
+):
+    lines = await load_period_lines(
+        session, current_user, start_date, end_date, tz
+    )
+    ranking = await run_in_threadpool(sales.top_products, lines, limit)
+    return await session.run_sync(sales.product_analytics_report, *ranking)
+
+
+@sales_router.get(
+    '/analytics/quantity_histogram',
+    response_model=schemas.QuantityHistogram,
+    dependencies=[Depends(versions.report_not_modified_async)]
+)
+async def get_quantity_histogram(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None),
+        bins: int = Query(10, gt=0, le=100)
+):
+    lines = await load_period_lines(
+        session, current_user, start_date, end_date, tz
+    )
+    return await run_in_threadpool(
+        sales.quantity_histogram_report, lines, bins
+    )
+
+
+@sales_router.get(
+    '/analytics/moving_average',
+    response_model=schemas.DailyRevenueReport,
+    dependencies=[Depends(versions.report_not_modified_async)]
+)
+async def get_revenue_moving_average(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None),
+        window: int = Query(7, gt=0, le=90)
+):
+    lines = await load_period_lines(
+        session, current_user, start_date, end_date, tz
+    )
+    return await run_in_threadpool(
+        sales.moving_average_report, lines, start_date, end_date, window
+    )
+
+
+@sales_router.post(
+    '/create-payment', status_code=HTTPStatus.OK, response_model=dict
+)
+async def create_payment(
+        sale: schemas.SaleSchema,
+        session: T_Session,
+        current_user: T_CurrentUser
+):
+    return await session.run_sync(
+        lambda s: sales.create_payment(
+            sale=sale, session=s, current_user=current_user
+        )
+    )
+
+
+@sales_router.post(
+    '/', status_code=HTTPStatus.CREATED, response_model=schemas.SalePublic
+)
+async def create_sale(
+        sale: schemas.SaleSchema,
+        session: T_Session,
+        current_user: T_CurrentUser,
+        idempotency_key: sales.T_IdempotencyKey = None,
+):
+    return await session.run_sync(
+        lambda s: sales.create_sale(
+            sale=sale,
+            session=s,
+            current_user=current_user,
+            idempotency_key=idempotency_key,
+        )
+    )
+
+
+# Usuários
+
+@users_router.post(
+    '/', status_code=HTTPStatus.CREATED, response_model=schemas.UserPublic
+)
+async def create_user(user: schemas.UserSchema, session: T_Session):
+    db_user = await session.scalar(
+        select(models.User).where(
+            (models.User.username == user.username)
+            | (models.User.email == user.email)
+        )
+    )
+
+    if db_user:
+        if db_user.username == user.username:
+            raise HTTPException(
+                status_code=HTTPStatus.CONFLICT,
+                detail='Username already exists',
+            )
+        elif db_user.email == user.email:
+            raise HTTPException(
+                status_code=HTTPStatus.CONFLICT,
+                detail='Email already exists',
+            )
+
+    db_user = models.User(
+        username=user.username,
+        email=user.email,
+        password=await security.get_password_async(user.password),
+    )
+    session.add(db_user)
+    await session.flush()
+    await session.run_sync(versions.bump, db_user.id)
+    await session.commit()
+    await session.refresh(db_user)
+
+    return db_user
+
+
+@users_router.put('/{user_id}', response_model=schemas.UserPublic)
+async def update_user(
+    user_id: int,
+    user: schemas.UserSchema,
+    session: T_Session,
+    current_user: T_Current_user_row,
+):
+    old_username = current_user.username
+    password = await security.get_password_async(user.password)
+    try:
+        current_user.username = user.username
+        current_user.password = password
+        current_user.email = user.email
+        await session.run_sync(versions.bump, current_user.id)
+        await session.commit()
+        await session.refresh(current_user)
+        security.invalidate_user(old_username)
+
+        return current_user
+
+    except IntegrityError:
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail='Username or Email already exists',
+        )
+
+
+@users_router.delete('/{user_id}', response_model=schemas.Message)
+async def delete_user(
+    user_id: int,
+    session: T_Session,
+    current_user: T_Current_user_row,
+):
+    if current_user.id != user_id:
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
+        )
+
+    username = current_user.username
+    # Invalida a identidade em cache nos outros workers
+    await session.run_sync(versions.bump, current_user.id)
+    await session.delete(current_user)
+    await session.commit()
+    security.invalidate_user(username)
+
+    return {'message': 'User deleted'}
+
+
+@users_router.get('/', response_model=schemas.UserList)
+async def read_users(
+    session: T_Session, skip: int = 0, limit: int = 100,
+):
+    users = await session.scalars(
+        select(models.User).offset(skip).limit(limit)
+    )
+    return {'users': users.all()}
+
+
+# Auth
+
+@auth_router.post('/token', response_model=schemas.Token)
+async def login_for_access_token(
+    session: T_Session,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+):
+    user = await session.scalar(
+        select(models.User).where(
+            models.User.username == form_data.username
+        )
+    )
+
+    if not user or not await security.verify_password_async(
+        form_data.password, user.password
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Incorrect username or password',
+        )
+
+    access_token = security.create_access_token(data={'sub': user.username})
+    return {'access_token': access_token, 'token_type': 'bearer'}
+
+
+@auth_router.post('/refresh_token', response_model=schemas.Token)
+async def refresh_access_token(user: T_CurrentUser):
+    new_access_token = security.create_access_token(
+        data={'sub': user.username}
+    )
+
+    return {'access_token': new_access_token, 'token_type': 'bearer'}
@@ -6,7 +6,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 import DB, security, schemas, models
-from security import get_current_user
+from security import AuthenticatedUser, get_authenticated_user
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
@@ -30,7 +30,9 @@ def login_for_access_token(
 
 
 @router.post('/refresh_token', response_model=schemas.Token)
-def refresh_access_token(user: Annotated[models.User, Depends(get_current_user)]):
+def refresh_access_token(
+    user: Annotated[AuthenticatedUser, Depends(get_authenticated_user)]
+):
     new_access_token = security.create_access_token(data={'sub': user.username})
 
     return {'access_token': new_access_token, 'token_type': 'bearer'}
\ No newline at end of file
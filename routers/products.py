@@ -1,22 +1,42 @@
+import base64
+import binascii
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import column, select, func, table
 from sqlalchemy.orm import Session
-import DB, security, schemas, models
+import DB, security, schemas, models, rollups, catalog, versions
+import serialization
+from product_cache import product_cache
+from settings import Settings, get_settings
+
+settings = get_settings()
 
 router = APIRouter(prefix='/products', tags=['products'])
 
 T_Session = Annotated[Session, Depends(DB.get_session)]
-T_CurrentUser = Annotated[models.User, Depends(security.get_current_user)]
+T_CurrentUser = Annotated[
+    security.AuthenticatedUser, Depends(security.get_authenticated_user)
+]
+T_Settings = Annotated[Settings, Depends(get_settings)]
+
+# Colunas de schemas.ProductPublic, lidas sem carregar o objeto inteiro
+PRODUCT_PUBLIC_COLUMNS = [
+    models.Product.id,
+    models.Product.name,
+    models.Product.price,
+    models.Product.QT,
+]
 
 
 @router.post(
     '/', status_code=HTTPStatus.CREATED, response_model=schemas.ProductPublic
 )
 def create_product(
-        product: schemas.ProductSchema, session: T_Session, current_user: T_CurrentUser
+    product: schemas.ProductSchema,
+    session: T_Session,
+    current_user: T_CurrentUser,
 ):
     db_product = models.Product(
         user_id=current_user.id,
@@ -26,32 +46,182 @@ def create_product(
         QT=product.QT
     )
     session.add(db_product)
+    versions.bump(session, current_user.id)
     session.commit()
     session.refresh(db_product)
+    product_cache.invalidate(current_user.id)
 
     return db_product
 
 
-@router.get('/', response_model=schemas.ProductListResponse)
+@router.post('/bulk', response_model=schemas.ProductImportResult)
+def bulk_import_products(
+        payload: Annotated[tuple[str, bytes], Depends(catalog.import_payload)],
+        session: T_Session,
+        current_user: T_CurrentUser,
+        settings: T_Settings,
+):
+    """Cria (linhas sem id) e atualiza (linhas com id) produtos em lote.
+
+    Aceita array JSON, NDJSON, CSV com cabeçalho ou upload multipart no
+    campo `file`. Linhas inválidas voltam em `errors`; as demais são
+    gravadas numa única transação.
+    """
+    import_format, content = payload
+    return catalog.import_products(
+        session,
+        current_user.id,
+        catalog.parse_rows(content, import_format),
+        settings.PRODUCT_IMPORT_BATCH_SIZE,
+    )
+
+
+@router.patch('/stock', response_model=schemas.StockAdjustmentResult)
+def adjust_stock(
+        adjustment: schemas.StockAdjustmentSchema,
+        session: T_Session,
+        current_user: T_CurrentUser,
+        settings: T_Settings,
+):
+    """Aplica variações (delta) ou contagens absolutas (QT) de estoque a
+    vários produtos numa única transação.
+
+    Ids que não existem ou são de outro usuário voltam em `missing`;
+    ajustes que deixariam o estoque negativo voltam em `rejected`.
+    """
+    return catalog.adjust_stock(
+        session,
+        current_user.id,
+        adjustment.items,
+        settings.STOCK_UPDATE_BATCH_SIZE,
+    )
+
+
+# Tabela FTS5 (trigram) mantida por triggers no SQLite; ver models.py
+products_fts = table('products_fts', column('rowid'), column('name'))
+# O trigram do FTS5 conta bytes: um termo de 2 letras com acento ('çã')
+# passa pelo índice sem trigrama nenhum e não acha nada
+FTS_MIN_LENGTH = 3
+
+
+def name_filter(session: Session, name: str):
+    """Filtro de busca por nome que usa o índice de cada banco.
+
+    PostgreSQL: LIKE atendido pelo índice GIN de trigramas (que serve
+    LIKE e ILIKE); continua diferenciando maiúsculas, como antes.
+    SQLite: LIKE na tabela FTS5 com tokenizer trigram, que, como o LIKE
+    do SQLite, não diferencia maiúsculas. Termos com menos de
+    FTS_MIN_LENGTH caracteres vão direto na tabela de produtos.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return models.Product.name.like(f'%{name}%')
+    if dialect == 'sqlite' and len(name) >= FTS_MIN_LENGTH:
+        return models.Product.id.in_(
+            select(products_fts.c.rowid).where(
+                products_fts.c.name.like(f'%{name}%')
+            )
+        )
+    return models.Product.name.contains(name)
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(cursor + padding).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Invalid cursor',
+        )
+
+
+@router.get(
+    '/',
+    response_model=schemas.ProductListResponse,
+    dependencies=[Depends(versions.not_modified)]
+)
 def read_products(
+        response: Response,
         session: T_Session,
         current_user: T_CurrentUser,
-        skip: int = 0,
-        limit: int = 100,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(100, gt=0, le=1000),
         name: str | None = Query(None),
-        product_id: int | None = Query(None)
+        product_id: int | None = Query(None),
+        after: str | None = Query(None),
+        include_total: bool | None = Query(None)
 ):
-    query = select(models.Product).where(models.Product.user_id == current_user.id)
+    """Lista os produtos do usuário.
+
+    Sem `after` a paginação é por skip/limit. Com `after` (o next_cursor da
+    página anterior) a consulta vira WHERE id > :after ORDER BY id, que
+    custa o mesmo em qualquer página. O total só é contado por padrão na
+    primeira página; use include_total para forçar ou dispensar.
+
+    As páginas ficam no cache de produtos do usuário até a próxima escrita
+    no catálogo dele.
+    """
+    # A versão no banco faz escritas de outros workers invalidarem a página
+    version = versions.current(session, current_user.id)
+    page = product_cache.read_through(
+        current_user.id,
+        (version, skip, limit, name, product_id, after, include_total),
+        lambda: load_products_page(
+            session,
+            current_user.id,
+            skip=skip,
+            limit=limit,
+            name=name,
+            product_id=product_id,
+            after=after,
+            include_total=include_total,
+        ),
+    )
+    return serialization.json_response(page, response)
+
+
+def load_products_page(
+    session: Session,
+    user_id: int,
+    skip: int,
+    limit: int,
+    name: str | None,
+    product_id: int | None,
+    after: str | None,
+    include_total: bool | None,
+) -> dict:
+    """Página no formato de schemas.ProductListResponse, já pronta para
+    virar JSON (e para ser guardada no cache)."""
+    query = select(*PRODUCT_PUBLIC_COLUMNS).where(
+        models.Product.user_id == user_id
+    )
     if name:
-        query = query.where(models.Product.name.contains(name))
+        query = query.where(name_filter(session, name))
     if product_id:
         query = query.where(models.Product.id == product_id)
 
+    if include_total is None:
+        include_total = after is None
+
     # Obter a contagem total antes de aplicar a paginação
-    total_count = session.scalar(select(func.count()).select_from(query.subquery()))
+    total_count = None
+    if include_total:
+        total_count = session.scalar(
+            select(func.count()).select_from(query.subquery())
+        )
 
-    # Aplicar paginação
-    products = session.scalars(query.offset(skip).limit(limit)).all()
+    # Aplicar paginação; uma linha a mais indica se existe próxima página
+    query = query.order_by(models.Product.id).limit(limit + 1)
+    if after is not None:
+        query = query.where(models.Product.id > decode_cursor(after))
+    else:
+        query = query.offset(skip)
+    products = session.execute(query).all()
 
     if not products:
         raise HTTPException(
@@ -59,7 +229,18 @@ def read_products(
             detail="Product(s) not found"
         )
 
-    return schemas.ProductListResponse(products=products, total_count=total_count)
+    next_cursor = None
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = encode_cursor(products[-1].id)
+
+    return {
+        'products': serialization.row_dicts(
+            products, [c.key for c in PRODUCT_PUBLIC_COLUMNS]
+        ),
+        'total_count': total_count,
+        'next_cursor': next_cursor,
+    }
 
 
 @router.put('/{product_id}', response_model=schemas.ProductPublic)
@@ -84,8 +265,10 @@ def update_product(
     for key, value in product.model_dump(exclude_unset=True).items():
         setattr(db_product, key, value)
 
+    versions.bump(session, current_user.id)
     session.commit()
     session.refresh(db_product)
+    product_cache.invalidate(current_user.id)
 
     return db_product
 
@@ -110,6 +293,8 @@ def delete_product(
             detail='Product not found',
         )
 
+    rollups.forget_product(session, db_product.id)
     session.delete(db_product)
+    versions.bump(session, current_user.id)
     session.commit()
-    return None
\ No newline at end of file
+    product_cache.invalidate(current_user.id)
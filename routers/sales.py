@@ -1,119 +1,542 @@
+import csv
+import importlib
+import io
+import json
+import math
+from functools import lru_cache
 from http import HTTPStatus
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import TYPE_CHECKING, Annotated, Literal
+from fastapi import (
+    APIRouter, Depends, Header, HTTPException, Query, Response
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func, and_
-import DB, security, schemas, models
-from security import get_current_user
-from datetime import date, datetime
+import DB, security, schemas, models, checkout, versions
+import serialization
+from settings import get_settings
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+if TYPE_CHECKING:
+    import analytics
+
+settings = get_settings()
 
 router = APIRouter(prefix='/sales', tags=['sales'])
 T_Session = Annotated[Session, Depends(DB.get_session)]
-T_CurrentUser = Annotated[models.User, Depends(security.get_current_user)]
-
+T_CurrentUser = Annotated[
+    security.AuthenticatedUser, Depends(security.get_authenticated_user)
+]
+T_ExportFormat = Annotated[
+    Literal['ndjson', 'csv'], Query(alias='format')
+]
+# Repetições do mesmo pedido com a mesma chave não criam outra venda
+T_IdempotencyKey = Annotated[str | None, Header(min_length=1, max_length=255)]
+
+# Linhas lidas do cursor (e escritas na resposta) por vez na exportação
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+EXPORT_COLUMNS = ['sale_date', 'product_name', 'quantity_sold', 'total_price']
+BEST_SELLING_COLUMNS = [
+    'product_id', 'product_name', 'total_quantity_sold', 'total_revenue'
+]
+
+
+def store_timezone(tz: str | None = None) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz or settings.STORE_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f'Fuso horário inválido: {tz}',
+        )
 
-@router.get('/daily_report', response_model=schemas.DailySales)
-def get_daily_sales_report(session: T_Session, current_user: T_CurrentUser):
-    today = date.today()
 
-    total_sales_count = session.query(models.Sale).filter(
-        and_(
-            func.date(models.Sale.created_at) == today,
-            models.Sale.user_id == current_user.id
+def check_period(
+    start_day: date, end_day: date, start_name: str, end_name: str
+):
+    """Recusa períodos invertidos ou maiores que REPORT_MAX_DAYS."""
+    if end_day < start_day:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f'{end_name} deve ser igual ou posterior a {start_name}',
         )
-    ).count()
-
-    total_sales_amount = session.query(func.sum(models.Sale.total_price)).filter(
-        and_(
-            func.date(models.Sale.created_at) == today,
-            models.Sale.user_id == current_user.id
+    if (end_day - start_day).days >= settings.REPORT_MAX_DAYS:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=(
+                f'O período pode ter no máximo {settings.REPORT_MAX_DAYS} '
+                'dias'
+            ),
         )
-    ).scalar() or 0
 
-    return schemas.DailySales(total_sales=total_sales_count, total_amount=total_sales_amount)
+
+def day_range(
+    start_day: date, end_day: date, tz: ZoneInfo
+) -> tuple[datetime, datetime]:
+    """Converte os dias [start_day, end_day] do fuso tz no intervalo
+    semiaberto [início, fim) em UTC, comparável direto com created_at."""
+    utc = ZoneInfo('UTC')
+    try:
+        start = datetime.combine(start_day, time.min, tzinfo=tz)
+        end = datetime.combine(
+            end_day + timedelta(days=1), time.min, tzinfo=tz
+        )
+        return (
+            start.astimezone(utc).replace(tzinfo=None),
+            end.astimezone(utc).replace(tzinfo=None),
+        )
+    except OverflowError:
+        # Dias colados em date.min/date.max (9999-12-31, por exemplo)
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Período fora do intervalo de datas suportado',
+        )
 
 
 @router.get(
-    '/report_by_period',
-    response_model=schemas.SalesByPeriodReport
+    '/daily_report',
+    response_model=schemas.DailySales,
+    dependencies=[Depends(versions.report_not_modified)]
 )
-def get_sales_by_period(
+def get_daily_sales_report(
         session: T_Session,
         current_user: T_CurrentUser,
-        start_date: date,
-        end_date: date
+        day: date | None = Query(None),
+        end_day: date | None = Query(None),
+        tz: str | None = Query(None)
 ):
-    query = (
+    """Total de vendas de um dia (hoje por padrão) ou de um intervalo de
+    dias [day, end_day].
+
+    No fuso da loja o total sai de daily_sales_totals (uma linha por dia).
+    Em outro fuso é uma única agregação sobre o intervalo semiaberto de
+    created_at, que usa o índice (user_id, created_at).
+    """
+    zone = store_timezone(tz)
+    start_day = day or datetime.now(zone).date()
+    end_day = end_day or start_day
+    check_period(start_day, end_day, 'day', 'end_day')
+
+    if zone.key == settings.STORE_TIMEZONE:
+        query = select(
+            func.coalesce(func.sum(models.DailySalesTotals.sale_count), 0),
+            func.coalesce(func.sum(models.DailySalesTotals.revenue), 0),
+        ).where(
+            models.DailySalesTotals.user_id == current_user.id,
+            models.DailySalesTotals.day >= start_day,
+            models.DailySalesTotals.day <= end_day,
+        )
+    else:
+        start, end = day_range(start_day, end_day, zone)
+        query = select(
+            func.count(models.Sale.id),
+            func.coalesce(func.sum(models.Sale.total_price), 0),
+        ).where(
+            models.Sale.user_id == current_user.id,
+            models.Sale.created_at >= start,
+            models.Sale.created_at < end,
+        )
+
+    total_sales_count, total_sales_amount = session.execute(query).one()
+
+    return schemas.DailySales(
+        total_sales=total_sales_count, total_amount=total_sales_amount
+    )
+
+
+def period_query(user_id: int, start_date: date, end_date: date):
+    return (
         select(
             models.Sale.created_at.label('sale_date'),
-            models.SaleItem.QT.label('quantity_sold'),
             models.Product.name.label('product_name'),
+            models.SaleItem.QT.label('quantity_sold'),
             models.SaleItem.product_price.label('total_price')
         )
+        .select_from(models.SaleItem)
         .join(models.Sale)
         .join(models.Product)
         .where(
             and_(
                 models.Sale.created_at >= start_date,
                 models.Sale.created_at <= end_date,
-                models.Sale.user_id == current_user.id
+                models.Sale.user_id == user_id
             )
         )
         .order_by(models.Sale.created_at)
     )
 
-    sales_data = session.execute(query).all()
 
-    report_items = [
-        schemas.SaleItemReport(
-            product_name=item.product_name,
-            quantity_sold=item.quantity_sold,
-            sale_date=item.sale_date,
-            total_price=item.total_price
+def export_header(export_format: str) -> str:
+    if export_format == 'csv':
+        return ','.join(EXPORT_COLUMNS) + '\r\n'
+    return ''
+
+
+def encode_export_rows(rows, export_format: str) -> str:
+    """Serializa um lote de linhas de period_query em NDJSON ou CSV."""
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(
+            (r.sale_date.isoformat(), r.product_name,
+             r.quantity_sold, r.total_price)
+            for r in rows
+        )
+        return buffer.getvalue()
+
+    return ''.join(
+        json.dumps({
+            'sale_date': r.sale_date.isoformat(),
+            'product_name': r.product_name,
+            'quantity_sold': r.quantity_sold,
+            'total_price': r.total_price,
+        }, ensure_ascii=False) + '\n'
+        for r in rows
+    )
+
+
+def export_response(
+    chunks, export_format: str, start_date: date, end_date: date
+) -> StreamingResponse:
+    filename = f'vendas_{start_date}_{end_date}.{export_format}'
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+def stream_sales_export(bind, query, export_format: str):
+    """Gera a exportação lote a lote a partir de um cursor no servidor.
+
+    Abre a própria sessão: a sessão da dependência já foi fechada quando
+    o StreamingResponse começa a consumir o gerador.
+    """
+    yield export_header(export_format)
+    with Session(bind) as session:
+        result = session.execute(
+            query.execution_options(yield_per=EXPORT_BATCH_SIZE)
         )
-        for item in sales_data
-    ]
+        for rows in result.partitions():
+            yield encode_export_rows(rows, export_format)
+
+
+@router.get('/report_by_period/export')
+def export_sales_by_period(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        export_format: T_ExportFormat = 'ndjson'
+):
+    """Mesmas linhas de /report_by_period, enviadas em NDJSON ou CSV
+    conforme são lidas do banco, com memória constante."""
+    query = period_query(current_user.id, start_date, end_date)
+    return export_response(
+        stream_sales_export(session.get_bind(), query, export_format),
+        export_format,
+        start_date,
+        end_date,
+    )
+
+
+@router.get(
+    '/report_by_period',
+    response_model=schemas.SalesByPeriodReport,
+    dependencies=[Depends(versions.report_not_modified)]
+)
+def get_sales_by_period(
+        response: Response,
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date
+):
+    query = period_query(current_user.id, start_date, end_date)
+    return sales_by_period_response(session.execute(query).all(), response)
 
-    return schemas.SalesByPeriodReport(sales=report_items)
+
+def sales_by_period_response(rows, response: Response):
+    # As linhas viram JSON direto, sem um SaleItemReport por linha
+    return serialization.json_response(
+        {'sales': serialization.row_dicts(rows, EXPORT_COLUMNS)}, response
+    )
 
 
 @router.get(
     '/best_selling',
-    response_model=schemas.BestSellingProductsReport
+    response_model=schemas.BestSellingProductsReport,
+    dependencies=[Depends(versions.report_not_modified)]
 )
 def get_best_selling_products(
+        response: Response,
         session: T_Session,
         current_user: T_CurrentUser,
-        limit: int = Query(10, gt=0, le=100)
+        limit: int = Query(10, gt=0, le=100),
+        days: int | None = Query(None, gt=0, le=366)
+):
+    """Produtos mais vendidos desde sempre ou nos últimos `days` dias.
+
+    Sem janela, o ranking sai de product_leaderboard pelo índice
+    (user_id, qty). Com janela (7, 30...) soma apenas as linhas de
+    daily_sales_rollup do período, uma por produto e dia.
+    """
+    rows = load_best_selling(session, current_user.id, limit, days)
+    return best_selling_response(rows, response)
+
+
+def load_best_selling(
+    session: Session, user_id: int, limit: int, days: int | None
 ):
+    if days is None:
+        ranking = (
+            select(
+                models.ProductLeaderboard.product_id,
+                models.ProductLeaderboard.qty,
+                models.ProductLeaderboard.revenue,
+            )
+            .where(models.ProductLeaderboard.user_id == user_id)
+            .order_by(models.ProductLeaderboard.qty.desc())
+            .limit(limit)
+            .subquery()
+        )
+    else:
+        rollup = models.DailySalesRollup
+        today = datetime.now(store_timezone()).date()
+        qty = func.sum(rollup.qty)
+        ranking = (
+            select(
+                rollup.product_id,
+                qty.label('qty'),
+                func.sum(rollup.revenue).label('revenue'),
+            )
+            .where(
+                rollup.user_id == user_id,
+                rollup.day > today - timedelta(days=days),
+            )
+            .group_by(rollup.product_id)
+            .order_by(qty.desc())
+            .limit(limit)
+            .subquery()
+        )
+
     query = (
         select(
             models.Product.id,
             models.Product.name,
-            func.sum(models.SaleItem.QT).label('total_quantity_sold'),
-            func.sum(models.SaleItem.QT * models.SaleItem.product_price).label('total_revenue')
-        )
-        .join(models.SaleItem, models.Product.id == models.SaleItem.product_id)
-        .join(models.Sale, models.SaleItem.sale_id == models.Sale.id)
-        .where(models.Sale.user_id == current_user.id)
-        .group_by(models.Product.id, models.Product.name)
-        .order_by(func.sum(models.SaleItem.QT).desc())
-        .limit(limit)
+            ranking.c.qty.label('total_quantity_sold'),
+            ranking.c.revenue.label('total_revenue'),
+        )
+        .join(ranking, models.Product.id == ranking.c.product_id)
+        .order_by(ranking.c.qty.desc())
+    )
+
+    return session.execute(query).all()
+
+
+def best_selling_response(rows, response: Response):
+    return serialization.json_response(
+        {'products': serialization.row_dicts(rows, BEST_SELLING_COLUMNS)},
+        response,
     )
 
-    best_sellers = session.execute(query).all()
 
-    report_products = [
-        schemas.BestSellingProduct(
-            product_id=item.id,
-            product_name=item.name,
-            total_quantity_sold=item.total_quantity_sold,
-            total_revenue=item.total_revenue
+@lru_cache
+def analytics_module():
+    """O módulo analytics, importado na primeira consulta de análise e não
+    na subida do app (ele carrega o NumPy)."""
+    return importlib.import_module('analytics')
+
+
+def load_period_lines(
+    session: Session,
+    current_user: security.AuthenticatedUser,
+    start_date: date,
+    end_date: date,
+    tz: str | None,
+) -> 'analytics.SaleLines':
+    """Linhas de venda dos dias [start_date, end_date] no fuso tz."""
+    check_period(start_date, end_date, 'start_date', 'end_date')
+    zone = store_timezone(tz)
+    start, end = day_range(start_date, end_date, zone)
+    return analytics_module().load_sale_lines(
+        session, current_user.id, start, end, zone
+    )
+
+
+# Cada análise é separada em leitura (load_period_lines, no banco) e
+# agregação (as funções *_report, só CPU): os routers assíncronos rodam a
+# primeira na sessão e a segunda num thread, fora do event loop.
+
+def buckets_report(quantity, revenue) -> schemas.AnalyticsBucketsReport:
+    return schemas.AnalyticsBucketsReport(buckets=[
+        schemas.AnalyticsBucket(bucket=i, quantity=q, revenue=r)
+        for i, (q, r) in enumerate(zip(quantity.tolist(), revenue.tolist()))
+    ])
+
+
+def revenue_by_hour_report(
+    lines: 'analytics.SaleLines',
+) -> schemas.AnalyticsBucketsReport:
+    return buckets_report(*analytics_module().by_hour(lines))
+
+
+def revenue_by_weekday_report(
+    lines: 'analytics.SaleLines',
+) -> schemas.AnalyticsBucketsReport:
+    return buckets_report(*analytics_module().by_weekday(lines))
+
+
+def top_products(
+    lines: 'analytics.SaleLines', limit: int
+) -> tuple[list, list, list]:
+    """(ids, quantidades, receitas) dos `limit` produtos que mais
+    venderam."""
+    columns = analytics_module().by_product(lines)
+    return tuple(column[:limit].tolist() for column in columns)
+
+
+def product_analytics_report(
+    session: Session, product_ids, quantity, revenue
+) -> schemas.ProductAnalyticsReport:
+    names = dict(
+        session.execute(
+            select(models.Product.id, models.Product.name).where(
+                models.Product.id.in_(product_ids)
+            )
+        ).all()
+    )
+
+    return schemas.ProductAnalyticsReport(products=[
+        schemas.ProductAnalytics(
+            product_id=product_id,
+            product_name=names.get(product_id, ''),
+            quantity=q,
+            revenue=r,
+        )
+        for product_id, q, r in zip(product_ids, quantity, revenue)
+    ])
+
+
+def quantity_histogram_report(
+    lines: 'analytics.SaleLines', bins: int
+) -> schemas.QuantityHistogram:
+    edges, counts = analytics_module().quantity_histogram(lines, bins)
+    return schemas.QuantityHistogram(
+        edges=edges.tolist(), counts=counts.tolist()
+    )
+
+
+def moving_average_report(
+    lines: 'analytics.SaleLines',
+    start_date: date,
+    end_date: date,
+    window: int,
+) -> schemas.DailyRevenueReport:
+    days, revenue, moving = analytics_module().daily_revenue(
+        lines, start_date, end_date, window
+    )
+
+    return schemas.DailyRevenueReport(window=window, days=[
+        schemas.DailyRevenue(
+            day=day,
+            revenue=amount,
+            moving_average=None if math.isnan(average) else average,
+        )
+        for day, amount, average in zip(
+            days.tolist(), revenue.tolist(), moving.tolist()
         )
-        for item in best_sellers
-    ]
+    ])
+
+
+@router.get(
+    '/analytics/revenue_by_hour',
+    response_model=schemas.AnalyticsBucketsReport,
+    dependencies=[Depends(versions.report_not_modified)]
+)
+def get_revenue_by_hour(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None)
+):
+    lines = load_period_lines(session, current_user, start_date, end_date, tz)
+    return revenue_by_hour_report(lines)
+
+
+@router.get(
+    '/analytics/revenue_by_weekday',
+    response_model=schemas.AnalyticsBucketsReport,
+    dependencies=[Depends(versions.report_not_modified)]
+)
+def get_revenue_by_weekday(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None)
+):
+    """Baldes de 0 (segunda-feira) a 6 (domingo)."""
+    lines = load_period_lines(session, current_user, start_date, end_date, tz)
+    return revenue_by_weekday_report(lines)
+
 
-    return schemas.BestSellingProductsReport(products=report_products)
+@router.get(
+    '/analytics/products',
+    response_model=schemas.ProductAnalyticsReport,
+    dependencies=[Depends(versions.report_not_modified)]
+)
+def get_product_analytics(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None),
+        limit: int = Query(10, gt=0, le=100)
+):
+    lines = load_period_lines(session, current_user, start_date, end_date, tz)
+    return product_analytics_report(session, *top_products(lines, limit))
+
+
+@router.get(
+    '/analytics/quantity_histogram',
+    response_model=schemas.QuantityHistogram,
+    dependencies=[Depends(versions.report_not_modified)]
+)
+def get_quantity_histogram(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None),
+        bins: int = Query(10, gt=0, le=100)
+):
+    lines = load_period_lines(session, current_user, start_date, end_date, tz)
+    return quantity_histogram_report(lines, bins)
+
+
+@router.get(
+    '/analytics/moving_average',
+    response_model=schemas.DailyRevenueReport,
+    dependencies=[Depends(versions.report_not_modified)]
+)
+def get_revenue_moving_average(
+        session: T_Session,
+        current_user: T_CurrentUser,
+        start_date: date,
+        end_date: date,
+        tz: str | None = Query(None),
+        window: int = Query(7, gt=0, le=90)
+):
+    """Receita diária e média móvel dos últimos `window` dias."""
+    lines = load_period_lines(session, current_user, start_date, end_date, tz)
+    return moving_average_report(lines, start_date, end_date, window)
 
 
 @router.post(
@@ -124,29 +547,13 @@ def create_payment(
         session: T_Session,
         current_user: T_CurrentUser
 ):
-    total_price = 0
-
-    for item in sale.items:
-        product = session.scalar(
-            select(models.Product).where(
-                models.Product.id == item.product_id,
-                models.Product.user_id == current_user.id
-            )
-        )
-
-        if not product:
-            raise HTTPException(
-                status_code=HTTPStatus.NOT_FOUND,
-                detail=f'Produto com ID {item.product_id} não encontrado'
-            )
-
-        if product.QT < item.QT:
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail=f'Produto {product.name} não tem estoque suficiente.'
-            )
-
-        total_price += product.price * item.QT
+    products = checkout.quote_cart_products(
+        session, current_user.id, sale.items
+    )
+    checkout.validate_stock(
+        products, checkout.requested_quantities(sale.items)
+    )
+    total_price = checkout.cart_total(products, sale.items)
 
     qr_code_data = {
         'payment_id': 'PAY_12345',
@@ -163,55 +570,9 @@ def create_payment(
 def create_sale(
         sale: schemas.SaleSchema,
         session: T_Session,
-        current_user: T_CurrentUser
+        current_user: T_CurrentUser,
+        idempotency_key: T_IdempotencyKey = None,
 ):
-    total_price = 0
-    sale_items = []
-
-    for item in sale.items:
-        product = session.scalar(
-            select(models.Product).where(
-                models.Product.id == item.product_id,
-                models.Product.user_id == current_user.id
-            )
-        )
-
-        if not product:
-            raise HTTPException(
-                status_code=HTTPStatus.NOT_FOUND,
-                detail=f'Produto com ID {item.product_id} não encontrado'
-            )
-        if product.QT < item.QT:
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail=f'Produto {product.name} não tem estoque suficiente.'
-            )
-
-        product.QT -= item.QT
-        session.add(product)
-
-        sale_item = models.SaleItem(
-            sale_id=0,
-            product_id=product.id,
-            QT=item.QT,
-            product_price=product.price
-        )
-        sale_items.append(sale_item)
-        total_price += product.price * item.QT
-
-    db_sale = models.Sale(
-        user_id=current_user.id,
-        total_price=total_price
+    return checkout.place_order(
+        session, current_user.id, sale.items, idempotency_key
     )
-    session.add(db_sale)
-    session.commit()
-    session.refresh(db_sale)
-
-    for item in sale_items:
-        item.sale_id = db_sale.id
-        session.add(item)
-
-    session.commit()
-    session.refresh(db_sale)
-
-    return db_sale
\ No newline at end of file
@@ -9,7 +9,10 @@ from sqlalchemy.exc import IntegrityError
 from DB import get_session
 from schemas import Message, UserSchema, UserPublic, UserList
 from models import User
-from security import get_password, get_session, get_current_user
+import versions
+from security import (
+    get_password, get_session, get_current_user, invalidate_user
+)
 
 router = APIRouter(prefix='/users', tags=['users'])
 T_Session = Annotated[Session, Depends(get_session)]
@@ -43,6 +46,8 @@ def create_user(user: UserSchema, session: T_Session):
         password=get_password(user.password),
     )
     session.add(db_user)
+    session.flush()
+    versions.bump(session, db_user.id)
     session.commit()
     session.refresh(db_user)
 
@@ -56,12 +61,15 @@ def update_user(
     session: T_Session,
     current_user: T_Current_user,
 ):
+    old_username = current_user.username
     try:
         current_user.username = user.username
         current_user.password = get_password(user.password)
         current_user.email = user.email
+        versions.bump(session, current_user.id)
         session.commit()
         session.refresh(current_user)
+        invalidate_user(old_username)
 
         return current_user
 
@@ -83,8 +91,12 @@ def delete_user(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
 
+    username = current_user.username
+    # Invalida a identidade em cache nos outros workers
+    versions.bump(session, current_user.id)
     session.delete(current_user)
     session.commit()
+    invalidate_user(username)
 
     return {'message': 'User deleted'}
 @router.get('/', response_model=UserList)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, model_validator
 from pydantic.fields import Field
-from datetime import datetime
+from datetime import date, datetime
 from typing import List
 
 
@@ -37,6 +37,22 @@ class ProductSchema(BaseModel):
     QT: int
 
 
+class ProductImportSchema(ProductSchema):
+    # Com id, a linha atualiza o produto existente do usuário
+    id: int | None = None
+
+
+class ProductImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class ProductImportResult(BaseModel):
+    inserted: int
+    updated: int
+    errors: List[ProductImportError]
+
+
 class ProductPublic(BaseModel):
     id: int
     name: str
@@ -52,6 +68,30 @@ class ProductUpdateSchema(BaseModel):
     QT: int | None = Field(None)
 
 
+class StockAdjustment(BaseModel):
+    product_id: int
+    # Exatamente um dos dois: variação (delta) ou contagem absoluta (QT)
+    delta: int | None = None
+    QT: int | None = Field(None, ge=0)
+
+    @model_validator(mode='after')
+    def delta_or_absolute(self):
+        if (self.delta is None) == (self.QT is None):
+            raise ValueError('Informe delta ou QT, e apenas um deles')
+        return self
+
+
+class StockAdjustmentSchema(BaseModel):
+    items: List[StockAdjustment]
+
+
+class StockAdjustmentResult(BaseModel):
+    updated: int
+    missing: List[int]
+    # Produtos cujo estoque ficaria negativo; não foram alterados
+    rejected: List[int]
+
+
 class SaleItemSchema(BaseModel):
     product_id: int
     QT: int
@@ -98,4 +138,42 @@ class BestSellingProductsReport(BaseModel):
 
 class ProductListResponse(BaseModel):
     products: List[ProductPublic]
-    total_count: int
\ No newline at end of file
+    total_count: int | None = None
+    next_cursor: str | None = None
+
+
+class AnalyticsBucket(BaseModel):
+    bucket: int
+    quantity: int
+    revenue: float
+
+
+class AnalyticsBucketsReport(BaseModel):
+    buckets: List[AnalyticsBucket]
+
+
+class ProductAnalytics(BaseModel):
+    product_id: int
+    product_name: str
+    quantity: int
+    revenue: float
+
+
+class ProductAnalyticsReport(BaseModel):
+    products: List[ProductAnalytics]
+
+
+class QuantityHistogram(BaseModel):
+    edges: List[float]
+    counts: List[int]
+
+
+class DailyRevenue(BaseModel):
+    day: date
+    revenue: float
+    moving_average: float | None
+
+
+class DailyRevenueReport(BaseModel):
+    window: int
+    days: List[DailyRevenue]
@@ -1,31 +1,165 @@
-from settings import Settings
+from settings import get_settings
+import asyncio
+import hmac
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from hashlib import sha256
 from datetime import datetime, timedelta
 from http import HTTPStatus
 from zoneinfo import ZoneInfo
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, Header, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, decode, encode,ExpiredSignatureError
 from pwdlib import PasswordHash
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from DB import get_session
-from models import User
+from cache import TTLCache
+from DB import get_async_session, get_session
+from models import TenantVersion, User
 
 # Criação da instância de Settings para acessar as variáveis de ambiente
-settings = Settings()
+settings = get_settings()
 
-pwd_context = PasswordHash.recommended()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
 
+# Identidade dos usuários autenticados, indexada pelo 'sub' do token. Cada
+# entrada guarda também a versão do usuário em tenant_versions, que muda a
+# cada alteração ou exclusão da conta: um acerto só vale se a versão no
+# banco ainda for a mesma, então uma conta alterada ou excluída em outro
+# worker deixa de autenticar na requisição seguinte.
+user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+# Claims de tokens cuja assinatura já foi verificada; cada entrada expira
+# junto com o 'exp' do próprio token
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    id: int
+    username: str
+    email: str
+
+    @classmethod
+    def from_user(cls, user: User):
+        return cls(id=user.id, username=user.username, email=user.email)
+
+
+class HashingPool:
+    """Executor limitado para o hash de senhas.
+
+    O Argon2 consome muita CPU e memória; rodar os hashes em poucos
+    workers limita a fatia de CPU de uma rajada de logins. Pedidos além da
+    capacidade (workers + fila) são recusados com 503 em vez de esperar.
+    """
+
+    def __init__(self, kind: str, workers: int, queue_size: int):
+        self.kind = kind
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='hashing'
+                )
+        return self._executor
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                    detail='Server busy, try again later',
+                    headers={'Retry-After': '1'},
+                )
+            self.in_flight += 1
+            executor = self._get_executor()
+
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args):
+        return self._submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def stats(self) -> dict:
+        return {
+            'executor': self.kind,
+            'workers': self.workers,
+            'capacity': self.capacity,
+            'in_flight': self.in_flight,
+            'rejected': self.rejected,
+        }
+
+
+hashing_pool = HashingPool(
+    kind=settings.HASHING_EXECUTOR,
+    workers=settings.HASHING_WORKERS,
+    queue_size=settings.HASHING_QUEUE_SIZE,
+)
+
+
+@lru_cache
+def password_hasher() -> PasswordHash:
+    """Argon2 montado no primeiro uso, e não ao importar o app."""
+    return PasswordHash.recommended()
+
+
+def _hash_password(password: str):
+    return password_hasher().hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str):
+    return password_hasher().verify(plain_password, hashed_password)
+
 
 def get_password(password: str):
-    return pwd_context.hash(password)
+    return hashing_pool.run(_hash_password, password)
 
 
 def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing_pool.run(_verify_password, plain_password, hashed_password)
+
+
+async def get_password_async(password: str):
+    return await hashing_pool.run_async(_hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await hashing_pool.run_async(
+        _verify_password, plain_password, hashed_password
+    )
 
 
 def create_access_token(data: dict):
@@ -34,35 +168,162 @@ def create_access_token(data: dict):
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
     to_encode.update({'exp': expire})
-    encoded_jwt = encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = encode(
+        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+    )
     return encoded_jwt
 
 
-def get_current_user(
-    session: Session = Depends(get_session),
-    token: str = Depends(oauth2_scheme),
-):
-    credentials_exception = HTTPException(
+def decode_token(token: str) -> dict:
+    """Valida o JWT, reaproveitando o resultado de tokens já verificados."""
+    key = sha256(token.encode()).hexdigest()
+    payload = token_cache.get(key)
+
+    if payload is None:
+        payload = decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+        token_cache.set(key, payload, expires_at=payload.get('exp'))
+
+    return payload
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+
+def get_token_subject(token: str = Depends(oauth2_scheme)) -> str:
     try:
-        payload = decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         subject_email = payload.get('sub')
 
         if not subject_email:
-            raise credentials_exception
+            raise _credentials_exception()
 
     except DecodeError:
-        raise credentials_exception
+        raise _credentials_exception()
 
     except ExpiredSignatureError:
-        raise credentials_exception
-    user = session.scalar(select(User).where(User.username == subject_email))
+        raise _credentials_exception()
+
+    return subject_email
+
+
+def _user_with_version(subject: str):
+    # Uma consulta só: usuário e versão saem do mesmo snapshot
+    return (
+        select(User, TenantVersion.version)
+        .outerjoin(TenantVersion, TenantVersion.user_id == User.id)
+        .where(User.username == subject)
+    )
+
+
+def _identity_version(user_id: int):
+    return select(TenantVersion.version).where(
+        TenantVersion.user_id == user_id
+    )
+
+
+def _remember(subject: str, user: User, version: int | None):
+    # Sem linha em tenant_versions não há como detectar a exclusão da
+    # conta em outro worker, então a identidade não vai para o cache
+    if version is not None:
+        user_cache.set(subject, (AuthenticatedUser.from_user(user), version))
+
+
+def _cached_identity(subject: str):
+    entry = user_cache.get(subject)
+    return (None, None) if entry is None else entry
+
+
+def get_current_user(
+    session: Session = Depends(get_session),
+    subject: str = Depends(get_token_subject),
+):
+    row = session.execute(_user_with_version(subject)).first()
+
+    if not row:
+        raise _credentials_exception()
+
+    user, version = row
+    _remember(subject, user, version)
+    return user
+
+
+def get_authenticated_user(
+    session: Session = Depends(get_session),
+    subject: str = Depends(get_token_subject),
+) -> AuthenticatedUser:
+    """Identidade do usuário logado, servida do cache sempre que possível.
+
+    Use no lugar de get_current_user quando o handler só precisa do id ou
+    do username: num acerto de cache a única consulta é a da versão do
+    usuário, pela chave primária de tenant_versions.
+    """
+    identity, version = _cached_identity(subject)
+    if identity is None or version != session.scalar(
+        _identity_version(identity.id)
+    ):
+        identity = AuthenticatedUser.from_user(
+            get_current_user(session, subject)
+        )
+
+    return identity
+
+
+async def get_current_user_async(
+    session: AsyncSession = Depends(get_async_session),
+    subject: str = Depends(get_token_subject),
+):
+    row = (await session.execute(_user_with_version(subject))).first()
+
+    if not row:
+        raise _credentials_exception()
+
+    user, version = row
+    _remember(subject, user, version)
+    return user
+
+
+async def get_authenticated_user_async(
+    session: AsyncSession = Depends(get_async_session),
+    subject: str = Depends(get_token_subject),
+) -> AuthenticatedUser:
+    identity, version = _cached_identity(subject)
+    if identity is None or version != await session.scalar(
+        _identity_version(identity.id)
+    ):
+        identity = AuthenticatedUser.from_user(
+            await get_current_user_async(session, subject)
+        )
+
+    return identity
+
+
+def require_metrics_token(authorization: str | None = Header(None)):
+    """Dependência do GET /metrics: exige Settings.METRICS_TOKEN e some
+    (404) quando ele não está configurado."""
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Not Found'
+        )
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    if not hmac.compare_digest(
+        (authorization or '').encode(), expected.encode()
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Could not validate credentials',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
 
-    if not user:
-        raise credentials_exception
 
-    return user
\ No newline at end of file
+def invalidate_user(username: str):
+    """Esquece a identidade neste processo. Os outros workers percebem a
+    mudança pela versão, que quem altera ou exclui a conta incrementa com
+    versions.bump antes do commit."""
+    user_cache.pop(username)
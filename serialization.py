@@ -0,0 +1,43 @@
+# loja/serialization.py
+"""Caminho rápido de JSON para as listagens grandes.
+
+Quando um endpoint devolve um modelo pydantic, o FastAPI o valida de
+novo contra o response_model antes de serializar: cada linha de um
+relatório vira um objeto, é validada duas vezes e só então vira JSON.
+Os endpoints de listagem (relatório por período, mais vendidos,
+catálogo) montam dicionários direto das linhas do banco e devolvem uma
+ORJSONResponse, que o FastAPI entrega sem validar. O response_model
+continua no decorator para a documentação OpenAPI; os testes garantem
+que a saída é a mesma do modelo.
+"""
+from decimal import Decimal
+from typing import Any, Iterable
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+
+def _default(value):
+    # SUM() de colunas numéricas volta como Decimal em alguns drivers
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} não é serializável em JSON')
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+def row_dicts(rows: Iterable, columns: list[str]) -> list[dict]:
+    """Linhas (tuplas) do SELECT como dicionários com as chaves do
+    schema de saída, na ordem de columns."""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def json_response(content: Any, response: Response) -> ORJSONResponse:
+    """ORJSONResponse com os cabeçalhos que as dependências da rota
+    puseram em response (ETag, Cache-Control...); o FastAPI só os copia
+    sozinho quando o endpoint não devolve uma Response pronta."""
+    return ORJSONResponse(content, headers=dict(response.headers))
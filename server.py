@@ -0,0 +1,64 @@
+# loja/server.py
+"""Servidor de produção: gunicorn gerenciando workers uvicorn.
+
+    python -m server
+
+- WEB_WORKERS processos (0 = um por CPU), cada um com seu event loop e
+  seu pool de conexões, limitado por DB_MAX_CONNECTIONS (DB.pool_limits).
+- preload_app: o app é importado e as páginas HTML são renderizadas uma
+  vez no processo mestre, antes do fork; os workers herdam tudo isso
+  pronto. Nada abre conexão na importação (engines, Argon2 e o pool de
+  hashing nascem no primeiro uso), então nenhum socket do banco é
+  compartilhado entre processos.
+- SIGHUP troca os workers aos poucos: sobe os novos e encerra os antigos
+  depois das requisições em andamento (até WEB_GRACEFUL_TIMEOUT
+  segundos). Como o app é pré-carregado, o HUP reaproveita o código do
+  mestre; para publicar código novo sem derrubar conexões envie SIGUSR2
+  (sobe um mestre novo ao lado) e depois SIGQUIT ao mestre antigo.
+  SIGTERM (docker stop, Cloud Run) também espera as requisições.
+
+Em desenvolvimento continue usando uvicorn main:app --reload.
+"""
+from gunicorn.app.base import BaseApplication
+
+from settings import get_settings, worker_count
+
+settings = get_settings()
+
+
+def options() -> dict:
+    return {
+        'bind': f'{settings.WEB_HOST}:{settings.PORT}',
+        'workers': worker_count(settings),
+        'worker_class': 'uvicorn_worker.UvicornWorker',
+        'preload_app': True,
+        'graceful_timeout': settings.WEB_GRACEFUL_TIMEOUT,
+        'max_requests': settings.WEB_MAX_REQUESTS,
+        # Espalha as reciclagens para os workers não reiniciarem juntos
+        'max_requests_jitter': settings.WEB_MAX_REQUESTS // 10,
+    }
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        import pages
+        from main import app
+
+        pages.static_pages.prerender()
+        return app
+
+
+def main():
+    Server(options()).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,7 @@
+import os
+from functools import lru_cache
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,4 +12,97 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY: str
     ALGORITHM: str
-    ACCESS_TOKEN_EXPIRE_MINUTES: int
\ No newline at end of file
+    ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    # Fuso usado para definir "o dia" nos relatórios de vendas. Os
+    # horários gravados em created_at são UTC.
+    STORE_TIMEZONE: str = 'UTC'
+
+    # Usa AsyncEngine/AsyncSession (asyncpg ou aiosqlite) e os routers
+    # assíncronos de routers/aio.py
+    ASYNC_DB: bool = False
+
+    # Pool de conexões (tamanho e overflow são ignorados no SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Conexões que o banco reserva para este serviço (0 = sem limite).
+    # Com um valor, cada worker usa no máximo
+    # DB_MAX_CONNECTIONS // workers conexões entre pool e overflow.
+    DB_MAX_CONNECTIONS: int = 0
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Maior período, em dias, aceito pelo daily_report e pelas análises
+    # de /sales/analytics (que carregam todas as linhas do período)
+    REPORT_MAX_DAYS: int = 366
+
+    # Cache da identidade do usuário autenticado (0 desliga o cache)
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: int = 300
+
+    # Cache de produtos por usuário (0 desliga). PRODUCT_CACHE_BACKEND
+    # aceita 'modulo:fabrica' para um backend compartilhado; ver
+    # cache.load_backend.
+    PRODUCT_CACHE_MAX_SIZE: int = 10_000
+    PRODUCT_CACHE_TTL_SECONDS: int = 60
+    PRODUCT_CACHE_BACKEND: str = ''
+
+    # Compressão das respostas (br com o pacote brotli instalado, senão
+    # gzip). Corpos menores que COMPRESSION_MINIMUM_SIZE bytes vão sem.
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Token exigido em GET /metrics (Authorization: Bearer <token>).
+    # Vazio desliga o endpoint.
+    METRICS_TOKEN: str = ''
+
+    # Claims de tokens já verificados, indexados pelo digest do token
+    TOKEN_CACHE_MAX_SIZE: int = 10_000
+
+    # Pool dedicado ao hash de senhas (Argon2). Acima de
+    # HASHING_WORKERS + HASHING_QUEUE_SIZE pedidos a API responde 503.
+    HASHING_EXECUTOR: Literal['thread', 'process'] = 'thread'
+    HASHING_WORKERS: int = 2
+    HASHING_QUEUE_SIZE: int = 16
+
+    # Linhas por INSERT/UPDATE em lote no POST /products/bulk
+    PRODUCT_IMPORT_BATCH_SIZE: int = 1000
+
+    # Produtos por UPDATE ... FROM (VALUES ...) no PATCH /products/stock
+    STOCK_UPDATE_BATCH_SIZE: int = 1000
+
+    # Por quanto tempo uma Idempotency-Key do POST /sales/ é lembrada
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+
+    # Servidor de produção (python -m server). WEB_WORKERS=0 usa um
+    # worker por CPU disponível; PORT é a porta que o Cloud Run informa.
+    WEB_WORKERS: int = 0
+    WEB_HOST: str = '0.0.0.0'
+    PORT: int = 8080
+    # Segundos para um worker terminar as requisições em andamento ao
+    # ser substituído (SIGHUP) ou desligado (SIGTERM)
+    WEB_GRACEFUL_TIMEOUT: int = 30
+    # Recicla cada worker após N requisições (0 desliga)
+    WEB_MAX_REQUESTS: int = 0
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Settings do processo: o ambiente e o .env são lidos uma vez só.
+
+    Os módulos chamam get_settings() na importação; rotas podem recebê-la
+    como dependência (Annotated[Settings, Depends(get_settings)]).
+    """
+    return Settings()
+
+
+def worker_count(settings: Settings) -> int:
+    """WEB_WORKERS, ou um worker por CPU que o processo pode usar."""
+    if settings.WEB_WORKERS > 0:
+        return settings.WEB_WORKERS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - macOS/Windows
+        return os.cpu_count() or 1
@@ -173,9 +173,12 @@ async function getData(endpoint, params, accessToken = null) {
         headers['Authorization'] = `Bearer ${accessToken}`;
     }
 
+    // 'no-cache' revalida com If-None-Match; um 304 da API reaproveita a
+    // resposta guardada pelo navegador sem baixar o JSON de novo
     const response = await fetch(`${API_BASE_URL}${endpoint}${queryString}`, {
         method: 'GET',
         headers,
+        cache: 'no-cache',
     });
     return handleResponse(response);
 }
\ No newline at end of file
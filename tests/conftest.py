@@ -2,13 +2,20 @@
 import pytest
 import factory
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from main import app
-from models import table_registry, User
-from DB import get_session
-from security import get_password
+from models import table_registry, User, Product
+from DB import get_async_session, get_session
+from product_cache import product_cache
+from security import get_password, token_cache, user_cache
+from settings import get_settings
+import versions
+
+# Com ASYNC_DB=true a suíte inteira roda contra os routers assíncronos
+settings = get_settings()
 
 class UserFactory(factory.Factory):
     class Meta:
@@ -18,24 +25,46 @@ class UserFactory(factory.Factory):
     email = factory.LazyAttribute(lambda obj: f'{obj.username}@test.com')
     # A linha 'password' foi removida para evitar conflitos.
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    user_cache.clear()
+    token_cache.clear()
+    product_cache.clear()
+    yield
+    user_cache.clear()
+    token_cache.clear()
+    product_cache.clear()
+
+
 @pytest.fixture()
-def client(session):
+def client(session, async_engine):
     def get_session_override():
         return session
 
+    async def get_async_session_override():
+        async with AsyncSession(async_engine) as async_session:
+            yield async_session
+
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_async_session] = (
+            get_async_session_override
+        )
         yield client
     app.dependency_overrides.clear()
 
 
 @pytest.fixture()
-def session():
-    engine = create_engine(
-        'sqlite:///:memory:',
-        connect_args={'check_same_thread': False},
-        poolclass=StaticPool,
-    )
+def session(tmp_path):
+    if settings.ASYNC_DB:
+        # O app usa outra conexão (aiosqlite), então o banco é um arquivo
+        engine = create_engine(f'sqlite:///{tmp_path / "test.db"}')
+    else:
+        engine = create_engine(
+            'sqlite:///:memory:',
+            connect_args={'check_same_thread': False},
+            poolclass=StaticPool,
+        )
     table_registry.metadata.create_all(engine)
 
     with Session(engine) as session:
@@ -44,6 +73,44 @@ def session():
     table_registry.metadata.drop_all(engine)
 
 
+@pytest.fixture()
+def async_engine(tmp_path, session):
+    if not settings.ASYNC_DB:
+        return None
+
+    return create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path / "test.db"}', poolclass=NullPool
+    )
+
+
+class Statements(list):
+    """SQL executado pela aplicação; .parameters tem os parâmetros de cada
+    comando, na mesma ordem."""
+
+    def __init__(self):
+        super().__init__()
+        self.parameters = []
+
+    def clear(self):
+        super().clear()
+        self.parameters.clear()
+
+
+@pytest.fixture()
+def statements(session, async_engine):
+    """Lista com o SQL executado pela aplicação durante o teste."""
+    engine = async_engine.sync_engine if async_engine else session.bind
+    executed = Statements()
+
+    def record(conn, cursor, statement, parameters, *args):
+        executed.append(statement)
+        executed.parameters.append(parameters)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', record)
+
+
 @pytest.fixture
 def user(session):
     password = 'testtest'
@@ -52,6 +119,9 @@ def user(session):
     )
 
     session.add(user)
+    session.flush()
+    # Como em create_user: toda conta nasce com uma versão
+    versions.bump(session, user.id)
     session.commit()
     session.refresh(user)
 
@@ -59,10 +129,45 @@ def user(session):
 
     return user
 
+
+@pytest.fixture
+def other_user(session):
+    other_user = UserFactory(password=get_password('testtest'))
+
+    session.add(other_user)
+    session.flush()
+    versions.bump(session, other_user.id)
+    session.commit()
+    session.refresh(other_user)
+
+    return other_user
+
+@pytest.fixture
+def metrics_headers(monkeypatch):
+    monkeypatch.setattr(settings, 'METRICS_TOKEN', 'metrics-secret')
+    return {'Authorization': 'Bearer metrics-secret'}
+
+
 @pytest.fixture()
 def token(client, user):
     response = client.post(
         '/auth/token',
-        data={'username': user.email, 'password': user.clean_password},
+        data={'username': user.username, 'password': user.clean_password},
+    )
+    return response.json().get('access_token')
+
+
+@pytest.fixture
+def product(session, user):
+    product = Product(
+        user_id=user.id,
+        name='Caneta',
+        description='Caneta azul',
+        price=2.5,
+        QT=10,
     )
-    return response.json().get('access_token')
\ No newline at end of file
+    session.add(product)
+    session.commit()
+    session.refresh(product)
+
+    return product
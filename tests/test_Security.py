@@ -1,6 +1,21 @@
-from jwt import decode
+import threading
+from datetime import datetime, timedelta
+from http import HTTPStatus
 
-from security import create_access_token
+import pytest
+from fastapi import HTTPException
+from freezegun import freeze_time
+from jwt import ExpiredSignatureError, decode
+
+import versions
+from security import (
+    HashingPool,
+    create_access_token,
+    decode_token,
+    hashing_pool,
+    token_cache,
+    user_cache,
+)
 from settings import Settings
 
 
@@ -12,4 +27,104 @@ def test_jwt():
     decoded = decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
 
     assert decoded['test'] == data['test']
-    assert 'exp' in decoded
\ No newline at end of file
+    assert 'exp' in decoded
+
+def test_authenticated_user_is_served_from_cache(
+    client, product, token, statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/products/', headers=headers)
+
+    statements.clear()
+    response = client.get('/products/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert not [s for s in statements if 'FROM users' in s]
+    assert user_cache.stats()['hits'] >= 1
+
+
+def test_update_user_invalidates_cache(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+    assert user_cache.get(user.username) is not None
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'renamed',
+            'email': 'renamed@example.com',
+            'password': 'secret',
+        },
+    )
+
+    assert user_cache.get(user.username) is None
+    response = client.post('/auth/refresh_token', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_user_deleted_by_another_worker_stops_authenticating(
+    client, session, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+    assert user_cache.get(user.username) is not None
+
+    # Outro worker exclui a conta: o cache deste processo não fica sabendo
+    versions.bump(session, user.id)
+    session.delete(user)
+    session.commit()
+
+    response = client.post('/auth/refresh_token', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_decoded_token_is_cached_until_exp():
+    with freeze_time('2025-01-01 12:00:00'):
+        token = create_access_token({'sub': 'alice'})
+        assert decode_token(token)['sub'] == 'alice'
+        assert decode_token(token)['sub'] == 'alice'
+        assert token_cache.stats()['hits'] == 1
+
+    settings = Settings()
+    expired = datetime(2025, 1, 1, 12, 0) + timedelta(
+        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES, seconds=1
+    )
+    with freeze_time(expired), pytest.raises(ExpiredSignatureError):
+        decode_token(token)
+
+
+def test_hashing_pool_rejects_when_saturated():
+    pool = HashingPool(kind='thread', workers=1, queue_size=0)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait()
+
+    worker = threading.Thread(target=pool.run, args=(slow_hash,))
+    worker.start()
+    started.wait()
+
+    with pytest.raises(HTTPException) as exc:
+        pool.run(lambda: None)
+
+    release.set()
+    worker.join()
+    assert exc.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert pool.stats()['rejected'] == 1
+    assert pool.run(lambda: 'ok') == 'ok'
+
+
+def test_login_returns_503_when_hashing_pool_is_full(
+    client, user, monkeypatch
+):
+    monkeypatch.setattr(hashing_pool, 'capacity', 0)
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.username, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
@@ -0,0 +1,249 @@
+import threading
+from datetime import date, datetime
+from http import HTTPStatus
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+import analytics
+from models import Product, Sale, SaleItem
+from routers import sales
+from settings import get_settings
+
+settings = get_settings()
+
+
+def make_lines(rows):
+    """rows: (horário local, product_id, quantidade, preço)."""
+    times, products, quantities, prices = zip(*rows)
+    quantity = np.array(quantities, dtype='int64')
+    return analytics.SaleLines(
+        local_times=np.array(times, dtype='datetime64[s]'),
+        product_ids=np.array(products, dtype='int64'),
+        quantities=quantity,
+        revenue=quantity * np.array(prices, dtype='float64'),
+    )
+
+
+LINES = make_lines([
+    (datetime(2025, 3, 10, 9, 30), 1, 2, 5.0),  # segunda-feira
+    (datetime(2025, 3, 10, 9, 45), 2, 1, 30.0),
+    (datetime(2025, 3, 11, 18, 0), 1, 4, 5.0),  # terça-feira
+    (datetime(2025, 3, 16, 23, 59), 1, 1, 5.0),  # domingo
+])
+
+
+def test_to_local_uses_offset_of_each_hour():
+    utc = np.array(
+        ['2025-01-15T12:00:00', '2025-07-15T12:00:00'], dtype='datetime64[s]'
+    )
+
+    local = analytics.to_local(utc, ZoneInfo('Europe/Lisbon'))
+
+    # Inverno UTC+0, verão UTC+1
+    assert local.tolist() == [
+        datetime(2025, 1, 15, 12, 0), datetime(2025, 7, 15, 13, 0)
+    ]
+
+
+def test_by_hour():
+    quantity, revenue = analytics.by_hour(LINES)
+
+    assert len(quantity) == 24
+    assert (quantity[9], revenue[9]) == (3, 40.0)
+    assert (quantity[18], revenue[18]) == (4, 20.0)
+    assert (quantity[23], revenue[23]) == (1, 5.0)
+    assert quantity.sum() == 8
+
+
+def test_by_weekday():
+    quantity, revenue = analytics.by_weekday(LINES)
+
+    assert quantity.tolist() == [3, 4, 0, 0, 0, 0, 1]
+    assert revenue.tolist() == [40.0, 20.0, 0, 0, 0, 0, 5.0]
+
+
+def test_by_product_sorted_by_revenue():
+    product_ids, quantity, revenue = analytics.by_product(LINES)
+
+    assert product_ids.tolist() == [1, 2]
+    assert quantity.tolist() == [7, 1]
+    assert revenue.tolist() == [35.0, 30.0]
+
+
+def test_quantity_histogram():
+    edges, counts = analytics.quantity_histogram(LINES, bins=10)
+
+    # Quantidades de 1 a 4: um balde por valor
+    assert edges.tolist() == [1, 2, 3, 4, 5]
+    assert counts.tolist() == [2, 1, 0, 1]
+
+
+def test_daily_revenue_moving_average():
+    days, revenue, moving = analytics.daily_revenue(
+        LINES, date(2025, 3, 10), date(2025, 3, 13), window=2
+    )
+
+    assert days.tolist() == [
+        date(2025, 3, 10), date(2025, 3, 11),
+        date(2025, 3, 12), date(2025, 3, 13),
+    ]
+    assert revenue.tolist() == [40.0, 20.0, 0.0, 0.0]
+    assert np.isnan(moving[0])
+    assert moving[1:].tolist() == [30.0, 10.0, 0.0]
+
+
+@pytest.fixture
+def analytics_sales(session, user):
+    pen = Product(
+        user_id=user.id, name='Caneta', description=None, price=2, QT=50
+    )
+    book = Product(
+        user_id=user.id, name='Livro', description=None, price=30, QT=5
+    )
+    session.add_all([pen, book])
+    session.flush()
+    for moment, product, quantity in [
+        (datetime(2025, 3, 10, 12, 0), pen, 3),
+        (datetime(2025, 3, 10, 12, 30), book, 1),
+        # 01:00 UTC do dia 12 ainda é dia 11 em São Paulo
+        (datetime(2025, 3, 12, 1, 0), pen, 1),
+    ]:
+        sale = Sale(user_id=user.id, total_price=product.price * quantity)
+        sale.created_at = moment
+        session.add(sale)
+        session.flush()
+        session.add(SaleItem(
+            sale_id=sale.id,
+            product_id=product.id,
+            QT=quantity,
+            product_price=product.price,
+        ))
+    session.commit()
+    return pen, book
+
+
+def get(client, token, path, **params):
+    response = client.get(
+        f'/sales/analytics/{path}',
+        headers={'Authorization': f'Bearer {token}'},
+        params={
+            'start_date': '2025-03-10', 'end_date': '2025-03-11', **params
+        },
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+def test_revenue_by_hour_endpoint(client, analytics_sales, token):
+    buckets = get(client, token, 'revenue_by_hour')['buckets']
+
+    assert buckets[12] == {'bucket': 12, 'quantity': 4, 'revenue': 36.0}
+    # A venda das 01:00 UTC do dia 12 fica fora do período em UTC
+    assert sum(b['quantity'] for b in buckets) == 4
+
+
+def test_revenue_by_weekday_endpoint_in_time_zone(
+    client, analytics_sales, token
+):
+    buckets = get(
+        client, token, 'revenue_by_weekday', tz='America/Sao_Paulo'
+    )['buckets']
+
+    assert buckets[0]['revenue'] == 36.0  # segunda-feira, dia 10
+    assert buckets[1]['revenue'] == 2.0  # terça-feira, dia 11
+
+
+def test_product_analytics_endpoint(client, analytics_sales, token):
+    pen, book = analytics_sales
+
+    products = get(client, token, 'products')['products']
+
+    assert products == [
+        {
+            'product_id': book.id,
+            'product_name': 'Livro',
+            'quantity': 1,
+            'revenue': 30.0,
+        },
+        {
+            'product_id': pen.id,
+            'product_name': 'Caneta',
+            'quantity': 3,
+            'revenue': 6.0,
+        },
+    ]
+
+
+def test_quantity_histogram_endpoint(client, analytics_sales, token):
+    histogram = get(client, token, 'quantity_histogram', bins=2)
+
+    assert histogram == {'edges': [1.0, 2.5, 4.0], 'counts': [1, 1]}
+
+
+def test_moving_average_endpoint(client, analytics_sales, token):
+    report = get(client, token, 'moving_average', window=2)
+
+    assert report == {'window': 2, 'days': [
+        {'day': '2025-03-10', 'revenue': 36.0, 'moving_average': None},
+        {'day': '2025-03-11', 'revenue': 0.0, 'moving_average': 18.0},
+    ]}
+
+
+def test_analytics_empty_period(client, token):
+    report = get(client, token, 'quantity_histogram')
+
+    assert report == {'edges': [], 'counts': []}
+
+
+def test_analytics_rejects_inverted_period(client, token):
+    response = client.get(
+        '/sales/analytics/products',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'start_date': '2025-03-11', 'end_date': '2025-03-10'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    ('start_date', 'end_date'),
+    [
+        ('9999-12-01', '9999-12-31'),  # o dia seguinte não existe
+        ('2024-01-01', '2025-12-31'),  # maior que REPORT_MAX_DAYS
+    ],
+)
+def test_analytics_rejects_unsupported_period(
+    client, token, start_date, end_date
+):
+    response = client.get(
+        '/sales/analytics/moving_average',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'start_date': start_date, 'end_date': end_date},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_aggregation_runs_off_the_event_loop(
+    client, analytics_sales, token, monkeypatch
+):
+    threads = {}
+    load, report = sales.load_period_lines, sales.revenue_by_hour_report
+
+    def recording_load(*args):
+        threads['load'] = threading.get_ident()
+        return load(*args)
+
+    def recording_report(lines):
+        threads['report'] = threading.get_ident()
+        return report(lines)
+
+    monkeypatch.setattr(sales, 'load_period_lines', recording_load)
+    monkeypatch.setattr(sales, 'revenue_by_hour_report', recording_report)
+    get(client, token, 'revenue_by_hour')
+
+    # No router assíncrono a leitura roda no thread do event loop e a
+    # agregação num thread do pool; no síncrono, tudo no mesmo thread
+    assert (threads['load'] != threads['report']) == settings.ASYNC_DB
@@ -0,0 +1,41 @@
+from freezegun import freeze_time
+
+from cache import TTLCache
+
+
+def test_cache_hit_and_miss_counters():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_entries_expire():
+    cache = TTLCache(maxsize=10, ttl=60)
+    with freeze_time('2025-01-01 12:00:00'):
+        cache.set('a', 1)
+    with freeze_time('2025-01-01 12:01:01'):
+        assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_cache_disabled_with_zero_maxsize():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
@@ -0,0 +1,190 @@
+import gzip
+from http import HTTPStatus
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import assets
+import compression
+from compression import BrotliResponder, accepted_encodings
+from models import Product
+from pages import static_pages
+
+
+@pytest.fixture
+def many_products(session, user):
+    session.add_all([
+        Product(
+            user_id=user.id,
+            name=f'Produto {i}',
+            description=None,
+            price=1,
+            QT=i,
+        )
+        for i in range(50)
+    ])
+    session.commit()
+
+
+def test_large_api_response_is_gzipped(client, many_products, token):
+    response = client.get('/products/', headers={
+        'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'
+    })
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert len(response.json()['products']) == 50
+
+
+def test_small_response_is_not_compressed(client, product, token):
+    response = client.get('/products/', headers={
+        'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'
+    })
+
+    assert 'content-encoding' not in response.headers
+
+
+def test_large_api_response_prefers_brotli(client, many_products, token):
+    pytest.importorskip('brotli')
+
+    response = client.get('/products/', headers={
+        'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip, br'
+    })
+
+    assert response.headers['content-encoding'] == 'br'
+    assert len(response.json()['products']) == 50
+
+
+def test_falls_back_to_gzip_without_brotli(
+    client, many_products, token, monkeypatch
+):
+    monkeypatch.setattr(compression, 'brotli', None)
+
+    response = client.get('/products/', headers={
+        'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip, br'
+    })
+
+    assert response.headers['content-encoding'] == 'gzip'
+    assert len(response.json()['products']) == 50
+
+
+def test_accepted_encodings_ignores_q_zero():
+    assert accepted_encodings('gzip;q=0, br;q=0.8, identity') == {
+        'br', 'identity'
+    }
+
+
+def test_brotli_responder():
+    brotli = pytest.importorskip('brotli')
+
+    responder = BrotliResponder(None, 0, quality=4)
+    body = responder.apply_compression(b'a' * 100, more_body=True)
+    body += responder.apply_compression(b'b' * 100, more_body=False)
+
+    assert brotli.decompress(body) == b'a' * 100 + b'b' * 100
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / 'api.js').write_text('const x = 1;\n' * 200)
+    (tmp_path / 'style.css').write_text('body { margin: 0; }\n' * 100)
+    return tmp_path
+
+
+def test_build_hashes_and_precompresses(static_dir):
+    manifest = assets.build(static_dir)
+
+    hashed = manifest['api.js']
+    assert hashed.startswith('dist/api.')
+    assert hashed.endswith('.js')
+    assert (static_dir / hashed).read_bytes() == (
+        static_dir / 'api.js'
+    ).read_bytes()
+    assert gzip.decompress(
+        (static_dir / f'{hashed}.gz').read_bytes()
+    ) == (static_dir / 'api.js').read_bytes()
+    assert assets.build(static_dir) == manifest
+
+
+def test_build_writes_brotli_copies(static_dir):
+    brotli = pytest.importorskip('brotli')
+
+    hashed = assets.build(static_dir)['api.js']
+
+    assert brotli.decompress(
+        (static_dir / f'{hashed}.br').read_bytes()
+    ) == (static_dir / 'api.js').read_bytes()
+
+
+def test_build_without_brotli_writes_only_gzip(static_dir, monkeypatch):
+    monkeypatch.setattr(assets, 'brotli', None)
+
+    hashed = assets.build(static_dir)['api.js']
+
+    assert (static_dir / f'{hashed}.gz').exists()
+    assert not (static_dir / f'{hashed}.br').exists()
+
+
+def test_hashed_name_changes_with_content(static_dir):
+    before = assets.build(static_dir)['style.css']
+    (static_dir / 'style.css').write_text('body { margin: 1px; }\n')
+
+    assert assets.build(static_dir)['style.css'] != before
+
+
+@pytest.fixture
+def static_client(static_dir):
+    app = FastAPI()
+    app.mount(
+        '/static', assets.PrecompressedStaticFiles(directory=static_dir)
+    )
+    return TestClient(app)
+
+
+def test_serves_precompressed_immutable_asset(static_client, static_dir):
+    hashed = assets.build(static_dir)['api.js']
+
+    response = static_client.get(
+        f'/static/{hashed}', headers={'Accept-Encoding': 'gzip'}
+    )
+
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['cache-control'] == assets.IMMUTABLE
+    assert 'javascript' in response.headers['content-type']
+    assert response.text == (static_dir / 'api.js').read_text()
+
+
+def test_identity_when_client_does_not_accept(static_client, static_dir):
+    hashed = assets.build(static_dir)['api.js']
+
+    response = static_client.get(
+        f'/static/{hashed}', headers={'Accept-Encoding': 'identity'}
+    )
+
+    assert 'content-encoding' not in response.headers
+    assert response.headers['vary'] == 'Accept-Encoding'
+
+
+def test_unhashed_file_is_revalidated(static_client):
+    response = static_client.get('/static/style.css')
+
+    assert response.headers['cache-control'] == assets.REVALIDATE
+    etag = response.headers['etag']
+    response = static_client.get(
+        '/static/style.css', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_templates_link_hashed_assets(client, monkeypatch):
+    monkeypatch.setattr(
+        assets, 'manifest', lambda: {'api.js': 'dist/api.0123abcd.js'}
+    )
+    static_pages.clear()
+
+    response = client.get('/login')
+
+    assert '/static/dist/api.0123abcd.js' in response.text
+    assert '/static/style.css' in response.text
@@ -0,0 +1,103 @@
+import threading
+import time
+from http import HTTPStatus
+
+from freezegun import freeze_time
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+import idempotency
+import models
+from models import table_registry
+
+
+def post_sale(client, token, product, quantity=2, key='venda-1'):
+    return client.post(
+        '/sales/',
+        headers={'Authorization': f'Bearer {token}', 'Idempotency-Key': key},
+        json={'items': [{'product_id': product.id, 'QT': quantity}]},
+    )
+
+
+def test_replay_returns_stored_sale(client, session, product, token):
+    first = post_sale(client, token, product)
+    second = post_sale(client, token, product)
+
+    assert first.status_code == second.status_code == HTTPStatus.CREATED
+    assert second.json() == first.json()
+    assert session.scalar(select(func.count(models.Sale.id))) == 1
+    session.refresh(product)
+    assert product.QT == 8
+
+
+def test_different_keys_create_different_sales(
+    client, session, product, token
+):
+    post_sale(client, token, product, key='venda-1')
+    post_sale(client, token, product, key='venda-2')
+
+    assert session.scalar(select(func.count(models.Sale.id))) == 2
+
+
+def test_key_reused_with_other_payload(client, product, token):
+    post_sale(client, token, product, quantity=2)
+    response = post_sale(client, token, product, quantity=3)
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.json() == {
+        'detail': 'Idempotency-Key já usada em outro pedido'
+    }
+
+
+def test_failed_sale_releases_key(client, session, product, token):
+    response = post_sale(client, token, product, quantity=50)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    product.QT = 100
+    session.commit()
+    response = post_sale(client, token, product, quantity=50)
+
+    assert response.status_code == HTTPStatus.CREATED
+
+
+def test_expired_key_runs_again(client, session, product, token):
+    with freeze_time('2025-03-20 10:00:00'):
+        post_sale(client, token, product)
+    with freeze_time('2025-03-22 10:00:00'):
+        post_sale(client, token, product, quantity=3)
+
+    assert session.scalar(select(func.count(models.Sale.id))) == 2
+
+    with freeze_time('2025-03-24 10:00:00'):
+        assert idempotency.purge_expired(session) == 1
+
+
+def test_concurrent_duplicate_waits_for_first(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "idem.db"}')
+    table_registry.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = models.User(username='pdv', password='x', email='pdv@a.com')
+        session.add(user)
+        session.commit()
+        user_id = user.id
+
+    replay = {}
+
+    def duplicate():
+        with Session(engine) as session:
+            replay['response'] = idempotency.claim(
+                session, user_id, 'venda-1', 'hash'
+            )
+
+    with Session(engine) as first:
+        assert idempotency.claim(first, user_id, 'venda-1', 'hash') is None
+        thread = threading.Thread(target=duplicate)
+        thread.start()
+        time.sleep(0.2)
+        # A repetição fica presa no INSERT até a primeira terminar
+        assert thread.is_alive()
+        idempotency.store(first, user_id, 'venda-1', {'id': 1})
+        first.commit()
+    thread.join()
+
+    assert replay['response'] == {'id': 1}
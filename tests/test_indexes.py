@@ -0,0 +1,60 @@
+import re
+from datetime import date, timedelta
+from http import HTTPStatus
+
+from models import Product
+
+# Uma linha "SCAN <tabela>" sem índice no EXPLAIN QUERY PLAN do SQLite
+FULL_SCAN = re.compile(
+    r'^SCAN '
+    r'(products|sales|sale_items|daily_sales_rollup|product_leaderboard)$'
+)
+
+
+def full_scans(session, statement, parameters):
+    plan = session.connection().exec_driver_sql(
+        f'EXPLAIN QUERY PLAN {statement}', parameters
+    )
+    return [row.detail for row in plan if FULL_SCAN.match(row.detail)]
+
+
+def test_router_queries_use_indexes(
+    client, session, user, token, statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    product = Product(
+        user_id=user.id, name='Caneta', description=None, price=2, QT=100
+    )
+    session.add(product)
+    session.commit()
+    today = date.today()
+    period = {
+        'start_date': (today - timedelta(days=1)).isoformat(),
+        'end_date': (today + timedelta(days=1)).isoformat(),
+    }
+    cart = {'items': [{'product_id': product.id, 'QT': 1}]}
+
+    statements.clear()
+    responses = [
+        client.post('/sales/create-payment', headers=headers, json=cart),
+        client.post('/sales/', headers=headers, json=cart),
+        client.get('/products/', headers=headers),
+        client.get('/products/?name=Can', headers=headers),
+        client.put(
+            f'/products/{product.id}', headers=headers, json={'price': 3}
+        ),
+        client.get('/sales/daily_report', headers=headers),
+        client.get('/sales/report_by_period', headers=headers, params=period),
+        client.get('/sales/best_selling', headers=headers),
+        client.get('/sales/best_selling?days=7', headers=headers),
+    ]
+
+    assert all(r.status_code < HTTPStatus.BAD_REQUEST for r in responses)
+    queries = [
+        (statement, parameters)
+        for statement, parameters in zip(statements, statements.parameters)
+        if statement.lstrip().upper().startswith('SELECT')
+    ]
+    assert queries
+    for statement, parameters in queries:
+        assert full_scans(session, statement, parameters) == [], statement
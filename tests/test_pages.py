@@ -0,0 +1,56 @@
+import gzip
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from pages import static_pages
+
+
+@pytest.fixture(autouse=True)
+def fresh_pages():
+    static_pages.clear()
+    yield
+    static_pages.clear()
+
+
+def test_page_is_rendered_once(client, monkeypatch):
+    client.get('/login')
+
+    def fail(name):
+        raise AssertionError(f'{name} renderizado de novo')
+
+    monkeypatch.setattr(static_pages.env, 'get_template', fail)
+    response = client.get('/login')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'text/html; charset=utf-8'
+    assert '<html' in response.text
+
+
+def test_prerender_on_startup():
+    with TestClient(app):
+        assert 'accounting.html' in static_pages._pages
+
+
+def test_page_etag_returns_304(client):
+    etag = client.get('/sales').headers['etag']
+
+    response = client.get('/sales', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+    assert response.content == b''
+
+
+def test_gzip_variant_has_its_own_etag(client):
+    plain = client.get('/login', headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/login', headers={'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['content-encoding'] == 'gzip'
+    assert compressed.headers['etag'] != plain.headers['etag']
+    assert compressed.text == plain.text
+    assert gzip.decompress(
+        static_pages.get('login.html').gzipped
+    ) == plain.content
@@ -0,0 +1,124 @@
+from http import HTTPStatus
+
+import cache
+import versions
+from product_cache import ProductCache, product_cache
+
+
+def product_selects(statements):
+    return [
+        s for s in statements
+        if s.startswith('SELECT') and 'FROM products' in s
+    ]
+
+
+def test_catalog_page_served_from_cache(client, product, token, statements):
+    headers = {'Authorization': f'Bearer {token}'}
+    first = client.get('/products/', headers=headers)
+
+    statements.clear()
+    second = client.get('/products/', headers=headers)
+
+    assert second.json() == first.json()
+    assert product_selects(statements) == []
+    assert product_cache.stats()['hits'] == 1
+
+
+def test_writes_invalidate_catalog_pages(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def listed_stock():
+        response = client.get('/products/', headers=headers)
+        return [p['QT'] for p in response.json()['products']]
+
+    assert listed_stock() == [10]
+
+    client.put(f'/products/{product.id}', headers=headers, json={'QT': 7})
+    assert listed_stock() == [7]
+
+    client.post('/sales/', headers=headers, json={
+        'items': [{'product_id': product.id, 'QT': 2}]
+    })
+    assert listed_stock() == [5]
+
+    client.patch('/products/stock', headers=headers, json={
+        'items': [{'product_id': product.id, 'delta': 10}]
+    })
+    assert listed_stock() == [15]
+
+    client.post('/products/', headers=headers, json={
+        'name': 'Lápis', 'price': 1, 'QT': 3
+    })
+    assert listed_stock() == [15, 3]
+
+    client.delete(f'/products/{product.id}', headers=headers)
+    assert listed_stock() == [3]
+    assert product_cache.stats()['invalidations'] == 5
+
+
+def test_create_payment_quotes_from_cache(
+    client, product, token, statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    cart = {'items': [{'product_id': product.id, 'QT': 2}]}
+    client.post('/sales/create-payment', headers=headers, json=cart)
+
+    statements.clear()
+    response = client.post('/sales/create-payment', headers=headers, json=cart)
+
+    assert response.json()['total_price'] == 5.0
+    assert product_selects(statements) == []
+
+
+def test_cache_is_per_tenant():
+    products = ProductCache(cache.TTLCache(maxsize=100, ttl=60))
+    products.read_through(1, ('page',), lambda: 'loja 1')
+    products.read_through(2, ('page',), lambda: 'loja 2')
+
+    products.invalidate(1)
+
+    assert products.read_through(1, ('page',), lambda: 'nova') == 'nova'
+    assert products.read_through(2, ('page',), lambda: 'nova') == 'loja 2'
+
+
+def test_read_before_invalidation_is_not_served_after_it():
+    products = ProductCache(cache.TTLCache(maxsize=100, ttl=60))
+
+    def stale_loader():
+        # Uma escrita termina enquanto a leitura ainda está no banco
+        products.invalidate(1)
+        return 'antigo'
+
+    assert products.read_through(1, ('page',), stale_loader) == 'antigo'
+    assert products.read_through(1, ('page',), lambda: 'novo') == 'novo'
+
+
+def test_load_backend_from_path():
+    backend = cache.load_backend('cache:TTLCache', 5, 30)
+
+    assert isinstance(backend, cache.TTLCache)
+    assert (backend.maxsize, backend.ttl) == (5, 30)
+
+
+def test_metrics_include_product_cache(client, metrics_headers):
+    response = client.get('/metrics', headers=metrics_headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert {'hit_rate', 'invalidations', 'served_age_max_s'} <= set(
+        response.json()['product_cache']
+    )
+
+
+def test_write_from_another_worker_invalidates_page(
+    client, session, product, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/products/', headers=headers)
+
+    # Outro processo grava: a versão muda no banco, o cache local não sabe
+    product.QT = 3
+    versions.bump(session, product.user_id)
+    session.commit()
+    response = client.get('/products/', headers=headers)
+
+    assert response.json()['products'][0]['QT'] == 3
@@ -0,0 +1,321 @@
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+import versions
+from models import Product
+from routers.products import name_filter
+
+
+@pytest.fixture
+def catalog(session, user):
+    products = [
+        Product(
+            user_id=user.id,
+            name=f'produto {i}',
+            description=None,
+            price=1.0,
+            QT=1,
+        )
+        for i in range(25)
+    ]
+    session.add_all(products)
+    session.commit()
+    return products
+
+
+def test_read_products_skip_limit(client, catalog, token):
+    response = client.get(
+        '/products/?skip=20&limit=10',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert response.status_code == HTTPStatus.OK
+    assert data['total_count'] == 25
+    assert [p['id'] for p in data['products']] == [
+        p.id for p in catalog[20:]
+    ]
+    assert data['next_cursor'] is None
+
+
+def test_read_products_cursor_walks_every_page(client, catalog, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    seen = []
+    url = '/products/?limit=10'
+
+    while url:
+        data = client.get(url, headers=headers).json()
+        seen.extend(p['id'] for p in data['products'])
+        cursor = data['next_cursor']
+        url = f'/products/?limit=10&after={cursor}' if cursor else None
+
+    assert seen == [p.id for p in catalog]
+
+
+def test_read_products_cursor_page_skips_count(
+    client, catalog, token, statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    first = client.get('/products/?limit=10', headers=headers).json()
+
+    statements.clear()
+    response = client.get(
+        f'/products/?limit=10&after={first["next_cursor"]}', headers=headers
+    )
+
+    assert response.json()['total_count'] is None
+    assert not [s for s in statements if 'count(' in s.lower()]
+
+
+@pytest.mark.parametrize(
+    'query', ['limit=0', 'limit=-1', 'limit=1001', 'skip=-1']
+)
+def test_read_products_rejects_out_of_range_page(
+    client, catalog, token, query
+):
+    response = client.get(
+        f'/products/?{query}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_read_products_limit_of_one_has_next_cursor(client, catalog, token):
+    response = client.get(
+        '/products/?limit=1', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    data = response.json()
+    assert [p['id'] for p in data['products']] == [catalog[0].id]
+    assert data['next_cursor'] is not None
+
+
+def test_read_products_invalid_cursor(client, catalog, token):
+    response = client.get(
+        '/products/?after=not-a-cursor!',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+def test_search_products_by_substring(client, session, catalog, token):
+    catalog[3].name = 'Caderno Universitário'
+    session.commit()
+
+    response = client.get(
+        '/products/?name=DERNO',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert response.status_code == HTTPStatus.OK
+    assert [p['name'] for p in data['products']] == ['Caderno Universitário']
+    assert data['total_count'] == 1
+
+
+@pytest.mark.parametrize(('term', 'expected'), [
+    ('Aç', 'Ação'),
+    ('çã', 'Ação'),
+    ('áp', 'Lápis'),
+])
+def test_search_short_accented_term(
+    client, session, catalog, token, term, expected
+):
+    catalog[3].name = 'Ação'
+    catalog[4].name = 'Lápis'
+    session.commit()
+
+    response = client.get(
+        '/products/', params={'name': term},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [p['name'] for p in response.json()['products']] == [expected]
+
+
+def test_search_ignores_deleted_products(client, session, catalog, token):
+    session.delete(catalog[0])
+    session.commit()
+
+    response = client.get(
+        '/products/?name=produto 0',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_search_uses_fts_index_on_sqlite(session, user):
+    query = select(Product).where(
+        Product.user_id == user.id, name_filter(session, 'caneta')
+    )
+    compiled = query.compile(
+        session.bind, compile_kwargs={'literal_binds': True}
+    )
+
+    plan = session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).all()
+
+    assert any('VIRTUAL TABLE' in row.detail for row in plan)
+
+
+def test_search_keeps_like_semantics_on_postgresql():
+    class PostgresSession:
+        def get_bind(self):
+            return SimpleNamespace(dialect=postgresql.dialect())
+
+    clause = name_filter(PostgresSession(), 'Caneta')
+    sql = str(clause.compile(dialect=postgresql.dialect()))
+
+    # LIKE, e não ILIKE: a busca continua diferenciando maiúsculas
+    assert 'products.name LIKE' in sql
+    assert 'ILIKE' not in sql
+
+
+def imported(session, user):
+    session.expire_all()
+    return session.execute(
+        select(Product.name, Product.price, Product.QT)
+        .where(Product.user_id == user.id)
+        .order_by(Product.id)
+    ).all()
+
+
+def test_bulk_import_json(client, session, user, token):
+    response = client.post(
+        '/products/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json=[
+            {'name': 'Caneta', 'price': 2.5, 'QT': 10},
+            {'name': 'Lápis', 'price': 'caro', 'QT': 5},
+            {'name': 'Livro', 'description': 'capa dura', 'price': 30,
+             'QT': 1},
+        ],
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert (data['inserted'], data['updated']) == (2, 0)
+    assert [e['row'] for e in data['errors']] == [2]
+    assert data['errors'][0]['detail'].startswith('price:')
+    assert imported(session, user) == [('Caneta', 2.5, 10), ('Livro', 30, 1)]
+
+
+def test_bulk_import_ndjson_reports_bad_lines(client, session, user, token):
+    body = '\n'.join([
+        '{"name": "Caneta", "price": 2.5, "QT": 10}',
+        '{"name": "Lápis",',
+        '{"name": "Livro", "price": 30}',
+    ])
+
+    response = client.post(
+        '/products/bulk',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+        content=body.encode(),
+    )
+
+    data = response.json()
+    assert data['inserted'] == 1
+    assert [e['row'] for e in data['errors']] == [2, 3]
+    assert data['errors'][0]['detail'].startswith('Invalid JSON')
+    assert data['errors'][1]['detail'] == 'QT: Field required'
+
+
+def test_bulk_import_without_valid_rows_keeps_version(
+    client, session, user, token
+):
+    before = versions.current(session, user.id)
+
+    response = client.post(
+        '/products/bulk',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+        content=b'{"name": "Livro", "price": 30}',
+    )
+
+    data = response.json()
+    assert data['inserted'] == 0
+    assert data['updated'] == 0
+    assert [e['row'] for e in data['errors']] == [1]
+    assert versions.current(session, user.id) == before
+
+
+def test_bulk_import_csv_upload_updates_by_id(
+    client, session, user, other_user, token
+):
+    pen = Product(
+        user_id=user.id, name='Caneta', description=None, price=2, QT=1
+    )
+    foreign = Product(
+        user_id=other_user.id, name='Alheio', description=None, price=1, QT=1
+    )
+    session.add_all([pen, foreign])
+    session.commit()
+    csv_file = (
+        'id,name,description,price,QT\n'
+        f'{pen.id},Caneta azul,,3.5,40\n'
+        ',Borracha,,1,100\n'
+        f'{foreign.id},Roubado,,0,0\n'
+    )
+
+    response = client.post(
+        '/products/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        files={'file': ('produtos.csv', csv_file, 'text/csv')},
+    )
+
+    data = response.json()
+    assert (data['inserted'], data['updated']) == (1, 1)
+    assert data['errors'] == [
+        {'row': 3, 'detail': f'Product {foreign.id} not found'}
+    ]
+    assert imported(session, user) == [
+        ('Caneta azul', 3.5, 40), ('Borracha', 1, 100)
+    ]
+    session.refresh(foreign)
+    assert foreign.name == 'Alheio'
+
+
+def test_bulk_import_batches_inserts(
+    client, session, user, token, statements, monkeypatch
+):
+    monkeypatch.setattr(
+        'routers.products.settings.PRODUCT_IMPORT_BATCH_SIZE', 100
+    )
+    rows = [{'name': f'produto {i}', 'price': 1, 'QT': 1} for i in range(250)]
+
+    statements.clear()
+    response = client.post(
+        '/products/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json=rows,
+    )
+
+    assert response.json()['inserted'] == 250
+    assert len(imported(session, user)) == 250
+    inserts = [s for s in statements if s.startswith('INSERT INTO products')]
+    assert len(inserts) <= 3
+
+
+def test_bulk_import_rejects_unknown_media_type(client, token):
+    response = client.post(
+        '/products/bulk',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/xml',
+        },
+        content=b'<produtos/>',
+    )
+
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
@@ -0,0 +1,182 @@
+from datetime import datetime
+from http import HTTPStatus
+
+from freezegun import freeze_time
+from sqlalchemy import select
+
+import rollups
+import versions
+from models import (
+    DailySalesRollup,
+    DailySalesTotals,
+    Product,
+    ProductLeaderboard,
+    Sale,
+    SaleItem,
+)
+
+
+def rollup_rows(session):
+    session.expire_all()
+    products = session.execute(
+        select(
+            DailySalesRollup.product_id,
+            DailySalesRollup.qty,
+            DailySalesRollup.revenue,
+            DailySalesRollup.sale_count,
+        ).order_by(DailySalesRollup.product_id)
+    ).all()
+    totals = session.execute(
+        select(DailySalesTotals.sale_count, DailySalesTotals.revenue)
+    ).all()
+    return products, totals
+
+
+def test_checkout_updates_rollups(client, session, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    pen = Product(
+        user_id=user.id, name='Caneta', description=None, price=2, QT=50
+    )
+    book = Product(
+        user_id=user.id, name='Livro', description=None, price=30, QT=5
+    )
+    session.add_all([pen, book])
+    session.commit()
+
+    client.post('/sales/', headers=headers, json={'items': [
+        {'product_id': pen.id, 'QT': 3},
+        {'product_id': book.id, 'QT': 1},
+        {'product_id': pen.id, 'QT': 1},
+    ]})
+    client.post('/sales/', headers=headers, json={'items': [
+        {'product_id': pen.id, 'QT': 2},
+    ]})
+
+    products, totals = rollup_rows(session)
+    assert products == [(pen.id, 6, 12.0, 2), (book.id, 1, 30.0, 1)]
+    assert totals == [(2, 42.0)]
+
+    # O backfill chega no mesmo resultado a partir das vendas
+    rollups.backfill(session)
+    assert rollup_rows(session) == (products, totals)
+
+
+def test_best_selling_reads_rollup(
+    client, session, product, token, statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/sales/', headers=headers, json={'items': [
+        {'product_id': product.id, 'QT': 4},
+    ]})
+
+    statements.clear()
+    response = client.get('/sales/best_selling', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'products': [{
+        'product_id': product.id,
+        'product_name': 'Caneta',
+        'total_quantity_sold': 4,
+        'total_revenue': 10.0,
+    }]}
+    assert not [s for s in statements if 'FROM sale_items' in s]
+
+
+def test_checkout_updates_leaderboard(client, session, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    for quantity in (2, 3):
+        client.post('/sales/', headers=headers, json={'items': [
+            {'product_id': product.id, 'QT': quantity},
+        ]})
+
+    session.expire_all()
+    row = session.scalar(select(ProductLeaderboard))
+    assert (row.product_id, row.qty, row.revenue) == (product.id, 5, 12.5)
+
+
+def test_best_selling_window(client, session, user, token):
+    pen = Product(
+        user_id=user.id, name='Caneta', description=None, price=2, QT=50
+    )
+    book = Product(
+        user_id=user.id, name='Livro', description=None, price=30, QT=5
+    )
+    session.add_all([pen, book])
+    session.flush()
+    # Muitos livros há 20 dias, poucas canetas ontem
+    for moment, item, quantity in [
+        (datetime(2025, 3, 1, 12, 0), book, 5),
+        (datetime(2025, 3, 20, 12, 0), pen, 2),
+    ]:
+        sale = Sale(user_id=user.id, total_price=item.price * quantity)
+        sale.created_at = moment
+        session.add(sale)
+        session.flush()
+        session.add(SaleItem(
+            sale_id=sale.id,
+            product_id=item.id,
+            QT=quantity,
+            product_price=item.price,
+        ))
+    session.commit()
+    rollups.backfill(session)
+
+    def ranking(**params):
+        with freeze_time('2025-03-21 10:00:00'):
+            response = client.get(
+                '/sales/best_selling',
+                headers={'Authorization': f'Bearer {token}'},
+                params=params,
+            )
+        assert response.status_code == HTTPStatus.OK
+        return [
+            (p['product_name'], p['total_quantity_sold'])
+            for p in response.json()['products']
+        ]
+
+    assert ranking() == [('Livro', 5), ('Caneta', 2)]
+    assert ranking(days=30) == [('Livro', 5), ('Caneta', 2)]
+    assert ranking(days=7) == [('Caneta', 2)]
+
+
+def test_delete_product_removes_it_from_leaderboard(
+    client, session, product, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/sales/', headers=headers, json={'items': [
+        {'product_id': product.id, 'QT': 1},
+    ]})
+
+    response = client.delete(f'/products/{product.id}', headers=headers)
+
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    session.expire_all()
+    assert session.scalar(select(ProductLeaderboard)) is None
+    assert session.scalar(select(DailySalesRollup)) is None
+
+
+def test_backfill_uses_store_time_zone_and_bumps_version(
+    session, product, monkeypatch
+):
+    monkeypatch.setattr(
+        rollups.settings, 'STORE_TIMEZONE', 'America/Sao_Paulo'
+    )
+    sale = Sale(user_id=product.user_id, total_price=5)
+    # 01:00 UTC do dia 12 ainda é dia 11 em São Paulo
+    sale.created_at = datetime(2025, 3, 12, 1, 0)
+    session.add(sale)
+    session.flush()
+    session.add(SaleItem(
+        sale_id=sale.id, product_id=product.id, QT=2, product_price=2.5
+    ))
+    session.commit()
+    version = versions.current(session, product.user_id)
+
+    assert rollups.backfill(session) == 1
+
+    session.expire_all()
+    totals = session.scalar(select(DailySalesTotals))
+    assert (str(totals.day), totals.sale_count, totals.revenue) == (
+        '2025-03-11', 1, 5.0
+    )
+    assert versions.current(session, product.user_id) == version + 1
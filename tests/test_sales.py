@@ -0,0 +1,243 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from http import HTTPStatus
+
+import pytest
+from freezegun import freeze_time
+from sqlalchemy import select
+
+import rollups
+from models import Product, Sale, SaleItem
+from routers import sales
+
+
+def test_create_sale(client, session, product, token):
+    response = client.post(
+        '/sales/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'items': [{'product_id': product.id, 'QT': 3}]},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    data = response.json()
+    assert data['total_price'] == 7.5
+
+    session.refresh(product)
+    assert product.QT == 7
+
+    items = session.scalars(select(SaleItem)).all()
+    assert len(items) == 1
+    assert items[0].sale_id == data['id']
+    assert items[0].product_price == 2.5
+
+
+def test_create_sale_repeated_product_checks_total_stock(
+    client, session, product, token
+):
+    response = client.post(
+        '/sales/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'items': [
+                {'product_id': product.id, 'QT': 6},
+                {'product_id': product.id, 'QT': 6},
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    session.refresh(product)
+    assert product.QT == 10
+    assert session.scalar(select(Sale)) is None
+
+
+def test_create_sale_product_not_found(client, product, token):
+    response = client.post(
+        '/sales/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'items': [{'product_id': 999, 'QT': 1}]},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {
+        'detail': 'Produto com ID 999 não encontrado'
+    }
+
+
+def test_create_sale_loads_cart_in_one_query(
+    client, session, user, token, statements
+):
+    products = [
+        Product(
+            user_id=user.id, name=f'p{i}', description=None, price=1, QT=5
+        )
+        for i in range(20)
+    ]
+    session.add_all(products)
+    session.commit()
+    cart = [{'product_id': p.id, 'QT': 1} for p in products]
+
+    statements.clear()
+    response = client.post(
+        '/sales/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'items': cart},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    product_selects = [
+        s for s in statements
+        if s.startswith('SELECT') and 'FROM products' in s
+    ]
+    assert len(product_selects) == 1
+
+
+@pytest.fixture
+def sales_history(session, user):
+    # created_at em UTC; 02:00 UTC ainda é o dia anterior em São Paulo
+    moments = [
+        datetime(2025, 3, 9, 15, 0),
+        datetime(2025, 3, 10, 2, 0),
+        datetime(2025, 3, 10, 18, 0),
+        datetime(2025, 3, 12, 12, 0),
+    ]
+    for moment in moments:
+        sale = Sale(user_id=user.id, total_price=10.0)
+        sale.created_at = moment
+        session.add(sale)
+    session.commit()
+    rollups.backfill(session)
+
+
+def test_daily_report_today(client, sales_history, token):
+    with freeze_time('2025-03-10 20:00:00'):
+        response = client.get(
+            '/sales/daily_report',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'total_sales': 2, 'total_amount': 20.0}
+
+
+def test_daily_report_in_store_time_zone(client, sales_history, token):
+    response = client.get(
+        '/sales/daily_report',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'day': '2025-03-09', 'tz': 'America/Sao_Paulo'},
+    )
+
+    assert response.json() == {'total_sales': 2, 'total_amount': 20.0}
+
+
+def test_daily_report_day_range_reads_rollup(
+    client, sales_history, token, statements
+):
+    statements.clear()
+    response = client.get(
+        '/sales/daily_report',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'day': '2025-03-09', 'end_day': '2025-03-11'},
+    )
+
+    assert response.json() == {'total_sales': 3, 'total_amount': 30.0}
+    totals = [s for s in statements if 'FROM daily_sales_totals' in s]
+    assert len(totals) == 1
+    assert not [s for s in statements if 'FROM sales' in s]
+
+
+def test_daily_report_invalid_time_zone(client, token):
+    response = client.get(
+        '/sales/daily_report',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'tz': 'Mars/Olympus'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_daily_report_day_at_end_of_calendar(client, token):
+    response = client.get(
+        '/sales/daily_report',
+        headers={'Authorization': f'Bearer {token}'},
+        params={'day': '9999-12-31', 'tz': 'America/Sao_Paulo'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.fixture
+def period_sales(session, product):
+    for moment, quantity in [
+        (datetime(2025, 3, 9, 15, 0), 2),
+        (datetime(2025, 3, 10, 18, 0), 1),
+    ]:
+        sale = Sale(user_id=product.user_id, total_price=quantity * 2.5)
+        sale.created_at = moment
+        session.add(sale)
+        session.flush()
+        session.add(SaleItem(
+            sale_id=sale.id,
+            product_id=product.id,
+            QT=quantity,
+            product_price=2.5,
+        ))
+    session.commit()
+
+
+PERIOD = {'start_date': '2025-03-01', 'end_date': '2025-03-31'}
+
+
+def test_export_sales_by_period_ndjson(client, period_sales, token):
+    response = client.get(
+        '/sales/report_by_period/export',
+        headers={'Authorization': f'Bearer {token}'},
+        params=PERIOD,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # Mesmo conteúdo do relatório em JSON, uma venda por linha
+    report = client.get(
+        '/sales/report_by_period',
+        headers={'Authorization': f'Bearer {token}'},
+        params=PERIOD,
+    )
+    assert lines == report.json()['sales']
+
+
+def test_export_sales_by_period_csv(client, period_sales, token):
+    response = client.get(
+        '/sales/report_by_period/export',
+        headers={'Authorization': f'Bearer {token}'},
+        params={**PERIOD, 'format': 'csv'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'attachment' in response.headers['content-disposition']
+    assert list(csv.reader(io.StringIO(response.text))) == [
+        ['sale_date', 'product_name', 'quantity_sold', 'total_price'],
+        ['2025-03-09T15:00:00', 'Caneta', '2', '2.5'],
+        ['2025-03-10T18:00:00', 'Caneta', '1', '2.5'],
+    ]
+
+
+def test_export_sales_by_period_streams_in_batches(
+    session, period_sales, product, monkeypatch
+):
+    monkeypatch.setattr(sales, 'EXPORT_BATCH_SIZE', 1)
+    query = sales.period_query(
+        product.user_id, date(2025, 3, 1), date(2025, 3, 31)
+    )
+
+    chunks = list(
+        sales.stream_sales_export(session.get_bind(), query, 'csv')
+    )
+
+    # Cabeçalho e depois um pedaço por lote lido do cursor
+    assert chunks[0].startswith('sale_date,')
+    assert len(chunks) == 3
@@ -0,0 +1,66 @@
+from decimal import Decimal
+from http import HTTPStatus
+
+import pytest
+
+import schemas
+import serialization
+
+
+@pytest.fixture
+def sold(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    for quantity in (1, 2):
+        client.post('/sales/', headers=headers, json={
+            'items': [{'product_id': product.id, 'QT': quantity}]
+        })
+    return headers
+
+
+@pytest.mark.parametrize(
+    ('url', 'model'),
+    [
+        (
+            '/sales/report_by_period'
+            '?start_date=2000-01-01&end_date=2100-01-01',
+            schemas.SalesByPeriodReport,
+        ),
+        ('/sales/best_selling', schemas.BestSellingProductsReport),
+        ('/sales/best_selling?days=7', schemas.BestSellingProductsReport),
+        ('/products/', schemas.ProductListResponse),
+    ],
+)
+def test_fast_path_matches_response_model(client, sold, url, model):
+    response = client.get(url, headers=sold)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/json'
+    body = response.json()
+    assert body == model.model_validate(body).model_dump(mode='json')
+    assert any(body.values())
+
+
+def test_fast_path_keeps_validator_headers(client, sold):
+    response = client.get('/sales/best_selling', headers=sold)
+
+    assert response.headers['etag'].startswith('W/"')
+    assert response.headers['cache-control'] == 'private, no-cache'
+
+
+def test_report_rows(client, sold, product):
+    response = client.get('/sales/best_selling', headers=sold)
+
+    assert response.json() == {
+        'products': [{
+            'product_id': product.id,
+            'product_name': 'Caneta',
+            'total_quantity_sold': 3,
+            'total_revenue': 7.5,
+        }]
+    }
+
+
+def test_decimal_sums_become_floats():
+    response = serialization.ORJSONResponse({'total': Decimal('7.50')})
+
+    assert response.body == b'{"total":7.5}'
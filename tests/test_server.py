@@ -0,0 +1,43 @@
+import server
+from settings import get_settings, worker_count
+
+
+def test_worker_count_from_settings(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, 'WEB_WORKERS', 3)
+
+    assert worker_count(settings) == 3
+
+
+def test_worker_count_defaults_to_cpus(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, 'WEB_WORKERS', 0)
+    monkeypatch.setattr('os.sched_getaffinity', lambda pid: {0, 1})
+
+    assert worker_count(settings) == 2
+
+
+def test_gunicorn_options(monkeypatch):
+    monkeypatch.setattr(server.settings, 'WEB_WORKERS', 4)
+    monkeypatch.setattr(server.settings, 'PORT', 9000)
+    monkeypatch.setattr(server.settings, 'WEB_MAX_REQUESTS', 1000)
+
+    options = server.options()
+
+    assert options['bind'] == '0.0.0.0:9000'
+    assert options['workers'] == 4
+    assert options['preload_app'] is True
+    assert options['worker_class'] == 'uvicorn_worker.UvicornWorker'
+    assert options['max_requests_jitter'] == 100
+
+
+def test_server_preloads_app_and_pages():
+    from main import app
+    from pages import static_pages
+
+    static_pages.clear()
+    application = server.Server({'workers': 2, 'preload_app': True})
+
+    assert application.cfg.workers == 2
+    assert application.load() is app
+    assert 'login.html' in static_pages._pages
@@ -0,0 +1,61 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Tempo máximo de `import main` num interpretador novo (melhor de 3).
+# Hoje fica perto de 0,85 s; a folga cobre máquinas de CI mais lentas,
+# mas não um import pesado novo no caminho da subida.
+IMPORT_BUDGET_SECONDS = 2.0
+
+ROOT = Path(__file__).parents[1]
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+import DB, security
+print(json.dumps({
+    'seconds': elapsed,
+    'numpy': 'numpy' in sys.modules,
+    'engine': DB._engine is not None,
+    'async_engine': DB._async_engine is not None,
+    'hasher': security.password_hasher.cache_info().currsize > 0,
+}))
+'''
+
+
+def import_main() -> dict:
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_import_main_within_budget():
+    seconds = min(import_main()['seconds'] for _ in range(3))
+
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+def test_import_main_defers_heavy_setup():
+    probe = import_main()
+
+    assert probe == {
+        'seconds': probe['seconds'],
+        'numpy': False,
+        'engine': False,
+        'async_engine': False,
+        'hasher': False,
+    }
+
+
+def test_settings_are_read_once():
+    from settings import get_settings
+
+    assert get_settings() is get_settings()
@@ -0,0 +1,182 @@
+import os
+import threading
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+import catalog
+import checkout
+import schemas
+from models import Product, Sale, User, table_registry
+
+THREADS = 8
+ATTEMPTS_PER_THREAD = 15
+INITIAL_STOCK = 40
+
+
+def database_urls():
+    urls = [pytest.param('sqlite', id='sqlite')]
+    postgres_url = os.environ.get('TEST_POSTGRES_URL')
+    urls.append(
+        pytest.param(
+            postgres_url,
+            id='postgresql',
+            marks=pytest.mark.skipif(
+                not postgres_url, reason='TEST_POSTGRES_URL not set'
+            ),
+        )
+    )
+    return urls
+
+
+@pytest.fixture(params=database_urls())
+def engine(request, tmp_path):
+    url = request.param
+    if url == 'sqlite':
+        url = f'sqlite:///{tmp_path / "stock.db"}'
+        engine = create_engine(url, connect_args={'timeout': 30})
+    else:
+        engine = create_engine(url, pool_size=THREADS)
+
+    table_registry.metadata.drop_all(engine)
+    table_registry.metadata.create_all(engine)
+    yield engine
+    table_registry.metadata.drop_all(engine)
+    engine.dispose()
+
+
+def test_reserve_stock_rejects_when_short(session, product):
+    assert not checkout.reserve_stock(
+        session, product.user_id, {product.id: product.QT + 1}
+    )
+    session.rollback()
+    session.refresh(product)
+    assert product.QT == 10
+
+
+def test_concurrent_checkouts_never_oversell(engine):
+    with Session(engine) as session:
+        user = User(username='stress', password='x', email='s@s.com')
+        session.add(user)
+        session.flush()
+        product = Product(
+            user_id=user.id,
+            name='Disputado',
+            description=None,
+            price=1.0,
+            QT=INITIAL_STOCK,
+        )
+        session.add(product)
+        session.commit()
+        user_id, product_id = user.id, product.id
+
+    items = [schemas.SaleItemSchema(product_id=product_id, QT=1)]
+    sold = []
+    rejected = []
+    barrier = threading.Barrier(THREADS)
+
+    def buyer():
+        barrier.wait()
+        for _ in range(ATTEMPTS_PER_THREAD):
+            with Session(engine) as session:
+                try:
+                    sold.append(checkout.place_order(session, user_id, items))
+                except HTTPException:
+                    rejected.append(1)
+
+    threads = [threading.Thread(target=buyer) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with Session(engine) as session:
+        stock = session.scalar(
+            select(Product.QT).where(Product.id == product_id)
+        )
+        sales = session.scalar(select(func.count()).select_from(Sale))
+
+    assert len(sold) == INITIAL_STOCK
+    assert len(rejected) == THREADS * ATTEMPTS_PER_THREAD - INITIAL_STOCK
+    assert stock == 0
+    assert sales == INITIAL_STOCK
+
+
+def test_merge_adjustments_keeps_order():
+    items = [
+        schemas.StockAdjustment(product_id=1, delta=5),
+        schemas.StockAdjustment(product_id=1, QT=10),
+        schemas.StockAdjustment(product_id=1, delta=-2),
+        schemas.StockAdjustment(product_id=2, delta=3),
+        schemas.StockAdjustment(product_id=2, delta=4),
+    ]
+
+    assert catalog.merge_adjustments(items) == {1: (10, -2), 2: (None, 7)}
+
+
+def test_stock_adjustment_needs_delta_or_qt():
+    with pytest.raises(ValueError, match='Informe delta ou QT'):
+        schemas.StockAdjustment(product_id=1)
+    with pytest.raises(ValueError, match='Informe delta ou QT'):
+        schemas.StockAdjustment(product_id=1, delta=1, QT=1)
+
+
+def test_patch_stock(client, session, user, other_user, token, statements):
+    products = [
+        Product(user_id=user.id, name=f'p{i}', description=None, price=1,
+                QT=10)
+        for i in range(3)
+    ]
+    foreign = Product(
+        user_id=other_user.id, name='alheio', description=None, price=1, QT=10
+    )
+    session.add_all([*products, foreign])
+    session.commit()
+    first, second, third = products
+
+    statements.clear()
+    response = client.patch(
+        '/products/stock',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'items': [
+            {'product_id': first.id, 'delta': -3},
+            {'product_id': second.id, 'QT': 42},
+            {'product_id': third.id, 'delta': -11},
+            {'product_id': foreign.id, 'QT': 0},
+            {'product_id': 999_999, 'delta': 1},
+        ]},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'updated': 2,
+        'missing': [foreign.id, 999_999],
+        'rejected': [third.id],
+    }
+    session.expire_all()
+    assert [p.QT for p in products] == [7, 42, 10]
+    assert foreign.QT == 10
+    updates = [
+        s for s in statements if s.lstrip().startswith(('UPDATE', 'WITH'))
+    ]
+    assert len(updates) == 1
+
+
+def test_patch_stock_without_changes_keeps_etag(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/products/', headers=headers).headers['etag']
+
+    response = client.patch('/products/stock', headers=headers, json={
+        'items': [{'product_id': 999_999, 'delta': 1}]
+    })
+    assert response.json() == {
+        'updated': 0, 'missing': [999_999], 'rejected': []
+    }
+
+    response = client.get(
+        '/products/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
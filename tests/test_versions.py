@@ -0,0 +1,172 @@
+from http import HTTPStatus
+
+from freezegun import freeze_time
+
+
+def test_catalog_has_validators(client, product, token):
+    response = client.get(
+        '/products/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    # A conta nasce com a versão 1 (create_user)
+    assert response.headers['etag'].startswith('W/"1-')
+    assert response.headers['cache-control'] == 'private, no-cache'
+
+
+def test_matching_etag_returns_304_without_querying(
+    client, product, token, statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/products/', headers=headers).headers['etag']
+
+    statements.clear()
+    response = client.get(
+        '/products/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    assert not [s for s in statements if 'FROM products' in s]
+
+
+def test_write_changes_etag(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/products/', headers=headers).headers['etag']
+
+    client.put(f'/products/{product.id}', headers=headers, json={'QT': 7})
+    response = client.get(
+        '/products/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] != etag
+    assert response.json()['products'][0]['QT'] == 7
+
+
+def test_etag_depends_on_query(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/products/', headers=headers).headers['etag']
+
+    response = client.get(
+        '/products/?limit=1', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_sale_changes_report_etag(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/sales/daily_report', headers=headers).headers['etag']
+
+    client.post('/sales/', headers=headers, json={
+        'items': [{'product_id': product.id, 'QT': 2}]
+    })
+    response = client.get(
+        '/sales/daily_report', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total_sales'] == 1
+
+
+def test_report_etag_changes_with_the_day(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    with freeze_time('2025-03-21 12:00:00'):
+        etag = client.get(
+            '/sales/daily_report', headers=headers
+        ).headers['etag']
+    with freeze_time('2025-03-22 12:00:00'):
+        response = client.get(
+            '/sales/daily_report', headers={**headers, 'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_report_etag_changes_with_the_day_in_requested_zone(client, token):
+    # Loja em UTC; às 15:00 UTC já é o dia seguinte em Tóquio
+    headers = {'Authorization': f'Bearer {token}'}
+    url = '/sales/daily_report?tz=Asia/Tokyo'
+    with freeze_time('2025-03-21 14:59:00'):
+        etag = client.get(url, headers=headers).headers['etag']
+    with freeze_time('2025-03-21 15:01:00'):
+        response = client.get(
+            url, headers={**headers, 'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_if_modified_since(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    with freeze_time('2025-03-21 10:00:00.1'):
+        client.put(
+            f'/products/{product.id}', headers=headers, json={'QT': 7}
+        )
+    with freeze_time('2025-03-21 10:00:05'):
+        last_modified = client.get(
+            '/products/', headers=headers
+        ).headers['last-modified']
+        response = client.get('/products/', headers={
+            **headers, 'If-Modified-Since': last_modified
+        })
+
+    assert last_modified == 'Fri, 21 Mar 2025 10:00:01 GMT'
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_second_write_in_the_same_second_is_not_304(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    with freeze_time('2025-03-21 10:00:00.1'):
+        client.put(
+            f'/products/{product.id}', headers=headers, json={'QT': 1}
+        )
+    with freeze_time('2025-03-21 10:00:00.5'):
+        response = client.get('/products/', headers=headers)
+    # O segundo ainda não acabou: sem Last-Modified para reaproveitar
+    assert 'last-modified' not in response.headers
+
+    with freeze_time('2025-03-21 10:00:00.9'):
+        client.put(
+            f'/products/{product.id}', headers=headers, json={'QT': 2}
+        )
+    with freeze_time('2025-03-21 10:00:05'):
+        response = client.get('/products/', headers={
+            **headers, 'If-Modified-Since': 'Fri, 21 Mar 2025 10:00:00 GMT'
+        })
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['products'][0]['QT'] == 2
+
+
+def test_reports_only_revalidate_by_etag(client, product, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    with freeze_time('2025-03-21 10:00:00'):
+        client.put(
+            f'/products/{product.id}', headers=headers, json={'QT': 7}
+        )
+    with freeze_time('2025-03-22 10:00:00'):
+        response = client.get('/sales/daily_report', headers={
+            **headers, 'If-Modified-Since': 'Sat, 22 Mar 2025 09:00:00 GMT'
+        })
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'last-modified' not in response.headers
+
+
+def test_etags_are_per_user(client, product, token, other_user):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/products/', headers=headers).headers['etag']
+    other_token = client.post(
+        '/auth/token',
+        data={'username': other_user.username, 'password': 'testtest'},
+    ).json()['access_token']
+
+    response = client.get('/products/', headers={
+        'Authorization': f'Bearer {other_token}', 'If-None-Match': etag
+    })
+
+    # Catálogo vazio: 404, mas nunca o 304 do outro usuário
+    assert response.status_code == HTTPStatus.NOT_FOUND
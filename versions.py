@@ -0,0 +1,212 @@
+# loja/versions.py
+"""GET condicional (ETag / Last-Modified) do catálogo e dos relatórios.
+
+Cada escrita em produtos ou vendas chama bump(session, user_id) antes do
+commit, o que incrementa tenant_versions.version na mesma transação. As
+rotas de leitura declaram a dependência not_modified: ela lê só essa
+linha (pela chave primária) e, se o cliente já tem a versão atual,
+responde 304 antes de qualquer consulta do endpoint.
+
+O ETag combina a versão com o caminho, a query string e o dia atual (no
+fuso do ?tz= da requisição ou no da loja), porque relatórios como o
+daily_report mudam com a virada do dia mesmo sem escrita nenhuma.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http import HTTPStatus
+from typing import Annotated
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import DB
+import models
+import rollups
+import security
+from conditional import is_fresh
+from settings import get_settings
+
+settings = get_settings()
+
+T_Session = Annotated[Session, Depends(DB.get_session)]
+T_CurrentUser = Annotated[
+    security.AuthenticatedUser, Depends(security.get_authenticated_user)
+]
+
+
+def bump(session: Session, user_id: int):
+    """Marca que os produtos ou vendas do usuário mudaram.
+
+    Chame por último, logo antes do commit: no PostgreSQL a linha fica
+    travada até o fim da transação.
+    """
+    table = models.TenantVersion.__table__
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    dialect_insert = rollups.UPSERT_DIALECTS.get(
+        session.get_bind().dialect.name
+    )
+
+    if dialect_insert is not None:
+        statement = dialect_insert(table).values(
+            user_id=user_id, version=1, changed_at=now
+        )
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={'version': table.c.version + 1, 'changed_at': now},
+        ))
+        return
+
+    updated = session.execute(
+        update(table)
+        .where(table.c.user_id == user_id)
+        .values(version=table.c.version + 1, changed_at=now)
+    ).rowcount
+    if not updated:
+        session.execute(
+            insert(table).values(user_id=user_id, version=1, changed_at=now)
+        )
+
+
+def bump_all(session: Session):
+    """bump para todos os usuários com versão (toda conta ganha uma ao ser
+    criada), depois de uma reconstrução como rollups.backfill."""
+    table = models.TenantVersion.__table__
+    session.execute(
+        update(table).values(
+            version=table.c.version + 1,
+            changed_at=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+    )
+
+
+def current(session: Session, user_id: int) -> int:
+    """Versão atual dos dados do usuário (0 se ele nunca escreveu nada)."""
+    return session.scalar(
+        select(models.TenantVersion.version).where(
+            models.TenantVersion.user_id == user_id
+        )
+    ) or 0
+
+
+def request_zone(request: Request) -> ZoneInfo:
+    """Fuso em que o relatório escolhe o dia: o ?tz= da requisição, como
+    em sales.store_timezone, ou o da loja."""
+    tz = request.query_params.get('tz')
+    try:
+        return ZoneInfo(tz or settings.STORE_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        # O endpoint responde 400; aqui basta um dia qualquer
+        return ZoneInfo(settings.STORE_TIMEZONE)
+
+
+def last_modified(changed_at: datetime) -> str | None:
+    """Last-Modified para changed_at (UTC sem fuso), ou None enquanto ele
+    não é confiável.
+
+    O cabeçalho só tem segundos: changed_at sobe para o segundo seguinte,
+    e até esse segundo passar o cabeçalho fica de fora. Assim uma escrita
+    posterior sempre cai num segundo mais novo, e If-Modified-Since nunca
+    devolve 304 para duas escritas no mesmo segundo.
+    """
+    ceiling = changed_at.replace(microsecond=0) + timedelta(seconds=1)
+    if ceiling > datetime.now(timezone.utc).replace(tzinfo=None):
+        return None
+    return format_datetime(ceiling.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def validators(
+    session: Session, request: Request, user_id: int, dated: bool = True
+) -> dict:
+    """Cabeçalhos ETag, Last-Modified e Cache-Control para a requisição.
+
+    Com dated=False não há Last-Modified: os relatórios mudam com a virada
+    do dia, que só o ETag acompanha.
+    """
+    row = session.execute(
+        select(
+            models.TenantVersion.version, models.TenantVersion.changed_at
+        ).where(models.TenantVersion.user_id == user_id)
+    ).first()
+    version, changed_at = row or (0, None)
+
+    today = datetime.now(request_zone(request)).date()
+    resource = f'{user_id}:{request.url.path}?{request.url.query}:{today}'
+    digest = hashlib.sha1(resource.encode()).hexdigest()[:16]
+
+    headers = {
+        'ETag': f'W/"{version}-{digest}"',
+        # O navegador guarda a resposta, mas revalida a cada uso
+        'Cache-Control': 'private, no-cache',
+    }
+    if dated and changed_at is not None:
+        modified = last_modified(changed_at)
+        if modified is not None:
+            headers['Last-Modified'] = modified
+    return headers
+
+
+def _apply(request: Request, response: Response, headers: dict):
+    if is_fresh(request, headers):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_MODIFIED, headers=headers
+        )
+    response.headers.update(headers)
+
+
+def not_modified(
+    request: Request,
+    response: Response,
+    session: T_Session,
+    current_user: T_CurrentUser,
+):
+    """Dependência: 304 se o cliente já tem esta versão; senão, adiciona
+    os validadores à resposta."""
+    _apply(request, response, validators(session, request, current_user.id))
+
+
+def report_not_modified(
+    request: Request,
+    response: Response,
+    session: T_Session,
+    current_user: T_CurrentUser,
+):
+    """not_modified para os relatórios: só o ETag, que inclui o dia."""
+    _apply(
+        request,
+        response,
+        validators(session, request, current_user.id, dated=False),
+    )
+
+
+async def not_modified_async(
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(DB.get_async_session)],
+    current_user: Annotated[
+        security.AuthenticatedUser,
+        Depends(security.get_authenticated_user_async),
+    ],
+):
+    headers = await session.run_sync(
+        lambda s: validators(s, request, current_user.id)
+    )
+    _apply(request, response, headers)
+
+
+async def report_not_modified_async(
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(DB.get_async_session)],
+    current_user: Annotated[
+        security.AuthenticatedUser,
+        Depends(security.get_authenticated_user_async),
+    ],
+):
+    headers = await session.run_sync(
+        lambda s: validators(s, request, current_user.id, dated=False)
+    )
+    _apply(request, response, headers)